@@ -1,7 +1,28 @@
+import itertools
+import json
+import math
+import os
+import time
+import zlib
+
 import pygame
 import random
 
-pygame.init()
+import assets
+from audio import AudioManager
+from camera import Camera
+from events import EventDispatcher
+from harness import KeyState
+from profiler import FrameProfiler, ProfilerOverlay
+from rendering import Background, BackgroundLayer, DirtyRenderer, RenderQueue, ScaledView
+from replay import RecordingInput
+from scheduler import Scheduler
+
+try:
+    from projectile_arrays import ProjectileArrays
+except ImportError:
+    # NumPy is optional and only needed for the vectorized projectile store
+    ProjectileArrays = None
 
 # Window dimensions
 WINDOW_WIDTH = 640
@@ -12,37 +33,216 @@ DRAGON_WIDTH = 135
 DRAGON_HEIGHT = 150
 BOSS_WIDTH = 135
 BOSS_HEIGHT = 165
-DEMON_WIDTH = 130
-DEMON_HEIGHT = 140
-FIREBALL_WIDTH = 50
-FIREBALL_HEIGHT = 48
 
-# Speeds of sprites
+# Speeds of sprites, in pixels per simulation step
 DRAGON_SPEED = 5
 BOSS_SPEED = 6
-DEMON_SPEED = -7
-FIREBALL_SPEED = 7
 
 ANIMATION_INTERVAL = 200
 DEMON_SPAWN_INTERVAL = 150
+# Once DEMON_SPAWN_INTERVAL has passed, each simulation step has a 2 in DEMON_SPAWN_ODDS chance of a spawn
+DEMON_SPAWN_ODDS = 150
+# Milliseconds between waves of enemies released by the boss, 0 for no waves
+BOSS_WAVE_INTERVAL = 0
+BOSS_WAVE_SIZE = 5
+# Milliseconds between the enemies of one wave
+BOSS_WAVE_SPACING = 120
+
+# Game logic runs in fixed steps, independent of how fast frames are drawn
+SIMULATION_HZ = 60
+SIMULATION_STEP_MS = 1000 / SIMULATION_HZ
+# Most simulation steps run per drawn frame before the backlog is dropped
+MAX_STEPS_PER_FRAME = 5
+# Frames per second the window is capped to, 0 for no cap
+FRAME_CAP = 60
+# Number of window sizes whose rescaled frames are kept
+SCALED_SIZE_CACHE = 4
+
+# Set to a file name to record the session as a replay
+REPLAY_RECORD_FILE = None
+
+# Keep fireballs and demons in NumPy arrays instead of sprites, for very large counts
+VECTORIZED_PROJECTILES = False
+PROJECTILE_ARRAY_CAPACITY = 1024
+
+# Size of a broad-phase collision grid cell, larger than any sprite
+COLLISION_CELL_SIZE = 128
+# Height of the rows ProjectileArrays.collide buckets projectiles into before sweeping along x
+COLLISION_SWEEP_ROW_HEIGHT = 16
+
+# How far past the window edges projectiles keep flying before they are removed
+WORLD_MARGIN = 0
+# Skip animating and drawing sprites outside the window
+VIEWPORT_CULLING = True
+# Distance past the window edges that counts as near; sprites farther out are far
+CULL_NEAR_MARGIN = 256
+# Near sprites are animated once every this many simulation steps, far sprites not at all
+NEAR_UPDATE_INTERVAL = 4
+
+# Set to True to redraw the whole window every frame instead of only the dirty rectangles
+FULL_REDRAW = False
+# Fraction of the window the dirty rectangles may cover before a frame is redrawn in full,
+# since restoring and pushing many overlapping rectangles costs more than one full blit
+DIRTY_AREA_FULL_REDRAW_FRACTION = 0.5
+# How often, in frames, the updated pixel area is shown in the window caption
+AREA_REPORT_INTERVAL = 30
+
+# Frame profiler settings
+PROFILER_PHASES = ("wait", "input", "update", "draw", "collisions", "animate")
+PROFILER_WINDOW = 120
+PROFILER_OVERLAY_KEY = pygame.K_F3
+PROFILER_REFRESH_INTERVAL = 15
+# Set to a file name to write the per-frame phase timings as CSV
+PROFILER_CSV_FILE = None
 
 # Colors
 BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+
+# The window, created by startup() so importing the game does not open one
+window = None
+
+# Images and sprite sheets baked into the asset cache
+ASSET_CACHE_FILE = "assets.cache"
+STATIC_IMAGES = {
+    "background": ("Background.bmp", None),
+}
+SPRITE_SHEETS = (
+    ("dragon.png", DRAGON_WIDTH, DRAGON_HEIGHT, 5),
+    ("boss.png", BOSS_WIDTH, BOSS_HEIGHT, 4),
+)
+# Fireball, demon and other projectile types, compiled into EntityType archetypes at import.
+# Resolved next to this file so importing the game from another working directory still finds it.
+ENTITY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "entities.json")
+# Background layers back to front, as (image name, scroll speed in pixels per simulation step).
+# The first layer is opaque. While every speed is 0 the renderer only restores dirty rectangles.
+BACKGROUND_LAYERS = (
+    ("background", 0),
+)
 
-# Create the window
-window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("EvilClutches")
+# The parallax background, built by startup()
+background = None
 
-# Load static images and masks
-background_image = pygame.image.load('Background.bmp').convert_alpha()
-fireball_image = pygame.image.load('fireball.png').convert_alpha()
-fireball_image = pygame.transform.scale(fireball_image, (64, 64))
+audio_manager = AudioManager()
 
 # Create groups
 dragon_group = pygame.sprite.GroupSingle()
 boss_group = pygame.sprite.GroupSingle()
 demon_group = pygame.sprite.Group()
 fireball_group = pygame.sprite.Group()
+# Group the entities of each role in the entity file are drawn and collided in
+role_groups = {"projectile": fireball_group, "enemy": demon_group}
+
+
+class SimulationClock:
+    """
+    Game time that moves forward one fixed step per simulation update,
+    so spawning and animation do not depend on the frame rate.
+    """
+    def __init__(self, step_ms):
+        self.step_ms = step_ms
+        self.ticks = 0.0
+        self.steps = 0
+
+    def get_ticks(self):
+        """
+        :return: Milliseconds of simulated time since the game started
+        """
+        return int(self.ticks)
+
+    def tick(self):
+        """
+        Advances the clock by one simulation step.
+        :return: None
+        """
+        self.ticks += self.step_ms
+        self.steps += 1
+
+
+def steps_for(milliseconds):
+    """
+    :param milliseconds: Whole milliseconds of game time
+    :return: Number of simulation steps until that much time has passed, rounded up
+    """
+    return -(-milliseconds * SIMULATION_HZ // 1000)
+
+
+class LiveInput:
+    """
+    Keeps the player's keyboard state from the key events the EventDispatcher hands it,
+    instead of polling pygame.
+    """
+    def __init__(self):
+        self.held = set()
+        self.pressed = []
+
+    def listen(self, dispatcher):
+        """
+        Binds the input to the key events of a dispatcher.
+        :param dispatcher: The EventDispatcher
+        :return: None
+        """
+        dispatcher.bind_event(pygame.KEYDOWN, self.key_down)
+        dispatcher.bind_event(pygame.KEYUP, self.key_up)
+        # Keys released while the window is out of focus never send KEYUP
+        dispatcher.bind_event(pygame.WINDOWFOCUSLOST, self.release_all)
+
+    def key_down(self, event):
+        """
+        Marks a key as held and queues its press for the next simulation step.
+        :param event: The KEYDOWN event
+        :return: None
+        """
+        self.held.add(event.key)
+        self.pressed.append(event.key)
+
+    def key_up(self, event):
+        """
+        :param event: The KEYUP event
+        :return: None
+        """
+        self.held.discard(event.key)
+
+    def release_all(self, event):
+        """
+        Lets go of every key when the window loses focus.
+        :param event: The WINDOWFOCUSLOST event
+        :return: None
+        """
+        self.held.clear()
+
+    def key_presses(self):
+        """
+        :return: List of the keys pressed since the last call
+        """
+        presses = self.pressed
+        self.pressed = []
+        return presses
+
+    def get_pressed(self):
+        """
+        :return: Snapshot of the held keys, indexable by key constant
+        """
+        return KeyState(frozenset(self.held))
+
+    def finished(self):
+        """
+        :return: False, the player's keyboard never runs out
+        """
+        return False
+
+    def end_tick(self):
+        """
+        Called after every simulation step. Live input has nothing to do here.
+        :return: None
+        """
+
+
+# Sources of time and input, replaced by the benchmark harness for deterministic runs
+game_time = SimulationClock(SIMULATION_STEP_MS)
+game_input = LiveInput()
+# Timers for boss spawns and other timed events
+scheduler = Scheduler(lambda: game_time.steps)
 
 
 class Dragon(pygame.sprite.Sprite):
@@ -50,23 +250,24 @@ class Dragon(pygame.sprite.Sprite):
         super().__init__()
         self.frame_list = init_animation_frames('dragon.png', DRAGON_WIDTH, DRAGON_HEIGHT, 5)
         self.current_frame_index = 0
-        self.last_time_frame_updated = pygame.time.get_ticks()
+        self.spawn_time = game_time.get_ticks()
         self.image = self.frame_list[0]
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = self.frame_list.masks[0]
         self.x_pos = 0
         self.y_pos = 0
         self.rect = pygame.Rect(self.x_pos, self.y_pos, DRAGON_WIDTH, DRAGON_HEIGHT)
+        self.previous_pos = None
 
     def update(self):
         """
         Updates the dragon's position based on user input and ensures it stays within boundaries.
         :return: None
         """
-        for event in pygame.event.get(eventtype=pygame.KEYDOWN):
-            if event.key == pygame.K_SPACE:
-                fireball_group.add(Fireball(self.x_pos, self.y_pos))
+        for key in game_input.key_presses():
+            if key == pygame.K_SPACE:
+                fireball_type.spawn(self.x_pos, self.y_pos)
 
-        keys = pygame.key.get_pressed()
+        keys = game_input.get_pressed()
         if keys[pygame.K_w]:
             self.y_pos -= DRAGON_SPEED
         if keys[pygame.K_s]:
@@ -83,18 +284,23 @@ class Boss(pygame.sprite.Sprite):
         super().__init__()
         self.frame_list = init_animation_frames('boss.png', BOSS_WIDTH, BOSS_HEIGHT, 4)
         self.current_frame_index = 0
-        self.last_time_frame_updated = pygame.time.get_ticks()
+        self.spawn_time = game_time.get_ticks()
         self.image = self.frame_list[0]
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = self.frame_list.masks[0]
         self.x_pos = WINDOW_WIDTH - BOSS_WIDTH
         self.y_pos = 0
         self.rect = pygame.Rect(self.x_pos, self.y_pos, BOSS_WIDTH, BOSS_HEIGHT)
+        self.previous_pos = None
         self.direction = 1
-        self.last_time_spawn = pygame.time.get_ticks()
+        # Spawn times and types come from the boss's own generator, seeded from the game's random
+        self.rng = random.Random(random.getrandbits(32))
+        self.schedule_spawn()
+        if BOSS_WAVE_INTERVAL and spawn_types:
+            scheduler.schedule(steps_for(BOSS_WAVE_INTERVAL), self.start_wave)
 
     def update(self):
         """
-        Updates the boss's position, direction, and spawns objects.
+        Updates the boss's position and direction. Spawning is driven by the scheduler.
         :return: None
         """
         self.y_pos += self.direction * BOSS_SPEED
@@ -107,28 +313,137 @@ class Boss(pygame.sprite.Sprite):
         elif self.rect.bottom >= WINDOW_HEIGHT:
             self.direction = -1
 
-        self.spawn_objects()
+    def schedule_spawn(self):
+        """
+        Schedules the next spawn. After DEMON_SPAWN_INTERVAL each step has a fixed chance
+        of spawning, so the wait is drawn once from the matching geometric distribution
+        instead of rolling the dice every step.
+        :return: None
+        """
+        # Every enemy type has a spawn weight of 0, so the boss never spawns
+        if not spawn_types:
+            return
+
+        chance = min(1.0, 2 / DEMON_SPAWN_ODDS)
+        steps = DEMON_SPAWN_INTERVAL * SIMULATION_HZ // 1000 + 1
+        if chance < 1:
+            steps += int(math.log(1.0 - self.rng.random()) / math.log(1.0 - chance))
+        scheduler.schedule(steps, self.spawn_objects)
 
     def spawn_objects(self):
         """
-        Spawns demons or babies based on a random number. Demons have a higher weighting
+        Spawns demons or babies, weighted by the spawn table, and schedules the next spawn
+        :return: None
+        """
+        self.spawn_enemy()
+        self.schedule_spawn()
+
+    def spawn_enemy(self):
+        """
+        Spawns one enemy from the boss's position.
+        :return: None
+        """
+        choose_enemy_type(self.rng).spawn(self.x_pos, self.y_pos)
+
+    def start_wave(self):
+        """
+        Releases BOSS_WAVE_SIZE enemies BOSS_WAVE_SPACING apart and schedules the next wave.
+        :return: None
+        """
+        for index in range(BOSS_WAVE_SIZE):
+            scheduler.schedule(steps_for(index * BOSS_WAVE_SPACING), self.spawn_enemy)
+        scheduler.schedule(steps_for(BOSS_WAVE_INTERVAL), self.start_wave)
+
+
+class SlottedSprite:
+    """
+    Sprite base that keeps all of its state in __slots__. pygame.sprite.Sprite has no
+    __slots__, so every subclass of it gets a __dict__. This class does the same group
+    bookkeeping as Sprite, which is all Group, groupcollide and the collide functions use.
+    """
+    __slots__ = ("sprite_groups",)
+
+    def __init__(self):
+        self.sprite_groups = set()
+
+    def add(self, *groups):
+        """
+        Adds the sprite to groups it is not in yet.
+        :return: None
+        """
+        for group in groups:
+            if group not in self.sprite_groups:
+                group.add_internal(self)
+                self.sprite_groups.add(group)
+
+    def remove(self, *groups):
+        """
+        Removes the sprite from groups it is in.
+        :return: None
+        """
+        for group in groups:
+            if group in self.sprite_groups:
+                group.remove_internal(self)
+                self.sprite_groups.remove(group)
+
+    def add_internal(self, group):
+        """
+        Records a group the sprite was added to, called by the group.
+        :return: None
+        """
+        self.sprite_groups.add(group)
+
+    def remove_internal(self, group):
+        """
+        Forgets a group the sprite was removed from, called by the group.
         :return: None
         """
-        num = random.randrange(150)
-        if num <= 1:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.last_time_spawn > DEMON_SPAWN_INTERVAL:
-                self.last_time_spawn = current_time
-                demon_group.add(Demon(self.x_pos, self.y_pos))
+        self.sprite_groups.remove(group)
 
+    def update(self, *args, **kwargs):
+        """
+        Does nothing, for subclasses to override like Sprite.update.
+        :return: None
+        """
 
-class Projectile(pygame.sprite.Sprite):
-    def __init__(self, image, rect, speed):
+    def kill(self):
+        """
+        Removes the sprite from every group it is in.
+        :return: None
+        """
+        for group in self.sprite_groups:
+            group.remove_internal(self)
+        self.sprite_groups.clear()
+
+    def groups(self):
+        """
+        :return: List of the groups the sprite is in
+        """
+        return list(self.sprite_groups)
+
+    def alive(self):
+        """
+        :return: True if the sprite is in any group
+        """
+        return bool(self.sprite_groups)
+
+
+class Projectile(SlottedSprite):
+    """
+    Sprite that flies across the screen at a fixed speed. Projectiles keep every attribute
+    in __slots__ and have no __dict__.
+    """
+    __slots__ = ("image", "rect", "mask", "speed", "pool", "in_pool")
+
+    def __init__(self, image, rect, speed, mask=None):
         super().__init__()
         self.image = image
         self.rect = rect
-        self.mask = pygame.mask.from_surface(image)
+        self.mask = mask if mask is not None else pygame.mask.from_surface(image)
         self.speed = speed
+        # Pool the projectile returns to when killed, set by ProjectilePool.acquire
+        self.pool = None
+        self.in_pool = False
 
     def update(self):
         """
@@ -137,123 +452,839 @@ class Projectile(pygame.sprite.Sprite):
         """
         self.rect.x += self.speed
 
-        if not (WINDOW_WIDTH >= self.rect.x >= 0 - self.rect.width):
+        if not (WINDOW_WIDTH + WORLD_MARGIN >= self.rect.x >= -WORLD_MARGIN - self.rect.width):
             self.kill()
 
+    def kill(self):
+        """
+        Removes the projectile from all groups and hands it back to its pool for reuse.
+        :return: None
+        """
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
 
-class Fireball(Projectile):
-    def __init__(self, x_pos, y_pos):
-        self.x_pos = x_pos + (DRAGON_WIDTH + DRAGON_WIDTH * 0.74) // 2 - FIREBALL_WIDTH // 2
-        self.y_pos = y_pos + (DRAGON_HEIGHT - DRAGON_WIDTH * 0.67) // 2 - FIREBALL_HEIGHT // 2
-        self.rect = pygame.Rect(self.x_pos, self.y_pos, FIREBALL_WIDTH, FIREBALL_HEIGHT)
-        super().__init__(fireball_image, self.rect, FIREBALL_SPEED)
 
+class Entity(Projectile):
+    """
+    Projectile sprite of any entity type, like a fireball, demon or baby. Everything that
+    is the same for the whole type lives on its EntityType, and the frame list and masks
+    are references to the type's shared ones.
+    """
+    __slots__ = ("entity_type", "frame_list", "previous_pos", "current_frame_index", "spawn_time")
 
-class Demon(Projectile):
-    def __init__(self, x_pos, y_pos):
-        self.x_pos = x_pos + BOSS_WIDTH // 2 - DEMON_WIDTH // 2
-        self.y_pos = y_pos + BOSS_HEIGHT // 2 - DEMON_HEIGHT // 2
-        self.rect = pygame.Rect(self.x_pos, self.y_pos, DEMON_WIDTH, DEMON_HEIGHT)
-        self.frame_list = init_animation_frames("demon.png", DEMON_WIDTH, DEMON_HEIGHT, 4)
+    def __init__(self, entity_type, x_pos, y_pos):
+        self.entity_type = entity_type
+        self.frame_list = entity_type.frame_list
+        super().__init__(self.frame_list[0], pygame.Rect(0, 0, entity_type.width, entity_type.height),
+                         entity_type.speed, self.frame_list.masks[0])
+        self.reset(x_pos, y_pos)
+
+    def reset(self, x_pos, y_pos):
+        """
+        Places the entity at its type's spawn point on the emitter and restarts its animation.
+        :param x_pos: x position of the emitter
+        :param y_pos: y position of the emitter
+        :return: None
+        """
+        entity_type = self.entity_type
+        self.frame_list = entity_type.frame_list
+        self.rect.update(x_pos + entity_type.offset_x, y_pos + entity_type.offset_y,
+                         entity_type.width, entity_type.height)
+        self.speed = entity_type.speed
+        self.previous_pos = None
         self.current_frame_index = 0
-        self.last_time_frame_updated = pygame.time.get_ticks()
-        super().__init__(self.frame_list[0], self.rect, DEMON_SPEED)
+        self.spawn_time = game_time.get_ticks()
+        self.image = self.frame_list[0]
+        self.mask = self.frame_list.masks[0]
 
 
-def init_animation_frames(file_name, frame_width, frame_height, frame_count):
+class ProjectilePool:
+    """
+    Free list of killed projectiles of one type, reused instead of building new sprites.
+    """
+    def __init__(self, create_projectile, capacity):
+        self.create_projectile = create_projectile
+        self.capacity = capacity
+        self.free = []
+        self.allocations = 0
+        self.reuses = 0
+        self.discards = 0
+
+    def acquire(self, x_pos, y_pos):
+        """
+        Gets a projectile at the given emitter position, recycling a killed one when possible.
+        :param x_pos: x position of the emitter
+        :param y_pos: y position of the emitter
+        :return: The projectile, not yet in any group
+        """
+        if self.free:
+            projectile = self.free.pop()
+            projectile.in_pool = False
+            projectile.reset(x_pos, y_pos)
+            self.reuses += 1
+        else:
+            projectile = self.create_projectile(x_pos, y_pos)
+            projectile.pool = self
+            self.allocations += 1
+
+        return projectile
+
+    def release(self, projectile):
+        """
+        Puts a killed projectile on the free list, or drops it if the pool is full.
+        :param projectile: The projectile that was killed
+        :return: None
+        """
+        if projectile.in_pool:
+            return
+        if len(self.free) < self.capacity:
+            projectile.in_pool = True
+            self.free.append(projectile)
+        else:
+            self.discards += 1
+
+    def stats(self):
+        """
+        :return: Dictionary of the pool occupancy and allocation counters
+        """
+        return {"free": len(self.free), "capacity": self.capacity, "allocations": self.allocations,
+                "reuses": self.reuses, "discards": self.discards}
+
+
+class EntityType:
+    """
+    Archetype compiled from one entry of the entity file. Spawn offsets, frames, masks,
+    the pool and the array store are worked out once and shared by every entity of the type.
+    """
+    __slots__ = ("name", "role", "image_file", "image_size", "frame_count", "width", "height", "speed",
+                 "offset_x", "offset_y", "pool_size", "spawn_weight", "sound", "group", "frame_list",
+                 "pool", "arrays")
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.role = definition["role"]
+        self.image_file = definition["image"]
+        image_size = definition.get("image_size")
+        self.image_size = tuple(image_size) if image_size else None
+        self.frame_count = definition.get("frames")
+        self.width, self.height = definition["size"]
+        self.speed = definition["speed"]
+        # The anchor is the point on the emitter the entity is centred on when it spawns
+        anchor_x, anchor_y = definition["anchor"]
+        self.offset_x = anchor_x - self.width // 2
+        self.offset_y = anchor_y - self.height // 2
+        self.pool_size = definition.get("pool_size", 0)
+        self.spawn_weight = definition.get("spawn_weight", 0)
+        self.sound = definition.get("sound")
+        self.group = role_groups[self.role]
+        self.frame_list = None
+        self.pool = None
+        self.arrays = None
+
+    def sheet(self):
+        """
+        :return: (file name, frame width, frame height, frame count) if the type is animated, otherwise None
+        """
+        if self.frame_count is None:
+            return None
+
+        return self.image_file, self.width, self.height, self.frame_count
+
+    def spawn_position(self, x_pos, y_pos):
+        """
+        :param x_pos: x position of the emitter
+        :param y_pos: y position of the emitter
+        :return: (x, y) position an entity of this type starts at
+        """
+        return x_pos + self.offset_x, y_pos + self.offset_y
+
+    def create(self, x_pos, y_pos):
+        """
+        Builds a new sprite of this type, used by the pool when it has none to reuse.
+        :return: The Entity
+        """
+        return Entity(self, x_pos, y_pos)
+
+    def reset_pool(self):
+        """
+        Replaces the pool with an empty one and drops the array store.
+        :return: None
+        """
+        self.pool = ProjectilePool(self.create, self.pool_size)
+        self.arrays = None
+
+    def spawn(self, x_pos, y_pos):
+        """
+        Spawns an entity of this type from an emitter's position.
+        :param x_pos: x position of the emitter
+        :param y_pos: y position of the emitter
+        :return: None
+        """
+        if self.frame_count is not None:
+            # Fetched through the frame cache so its counters show spawns reuse the shared frames
+            self.frame_list = frame_cache.get(self.image_file, self.width, self.height, self.frame_count)
+        if self.arrays is not None:
+            self.arrays.spawn(x_pos + self.offset_x, y_pos + self.offset_y, self.speed, game_time.get_ticks())
+        else:
+            # Sprite.add style, since Group.add only takes its fast path for pygame Sprites
+            self.pool.acquire(x_pos, y_pos).add(self.group)
+        if self.sound is not None:
+            audio_manager.play(self.sound)
+
+
+def load_entity_types(file_name):
+    """
+    Reads the entity file into EntityType archetypes, without their frames.
+    :param file_name: The JSON entity file
+    :return: Dictionary of entity name to EntityType
+    """
+    with open(file_name) as entity_file:
+        definitions = json.load(entity_file)
+
+    # Check what would otherwise only fail on the first spawn, or never show at all
+    if "fireball" not in definitions:
+        raise ValueError(f"{file_name} has no fireball entity")
+    for name, definition in definitions.items():
+        if definition.get("role") not in role_groups:
+            raise ValueError(f"{file_name}: {name} has role {definition.get('role')!r}, "
+                             f"expected one of {', '.join(role_groups)}")
+        sound = definition.get("sound")
+        if sound is not None and sound not in audio_manager.sound_files:
+            raise ValueError(f"{file_name}: {name} plays unknown sound {sound!r}")
+
+    return {name: EntityType(name, definition) for name, definition in definitions.items()}
+
+
+def compile_spawn_table(types):
+    """
+    Builds the cumulative weights the boss picks enemy types with.
+    :param types: List of enemy EntityTypes
+    :return: (list of the types that can spawn, list of their cumulative weights)
+    """
+    spawn_types = [entity_type for entity_type in types if entity_type.spawn_weight > 0]
+    cumulative_weights = list(itertools.accumulate(entity_type.spawn_weight for entity_type in spawn_types))
+    return spawn_types, cumulative_weights
+
+
+entity_types = load_entity_types(ENTITY_FILE)
+fireball_type = entity_types["fireball"]
+enemy_types = [entity_type for entity_type in entity_types.values() if entity_type.role == "enemy"]
+spawn_types, spawn_weights = compile_spawn_table(enemy_types)
+
+
+def choose_enemy_type(rng):
+    """
+    Picks the type of the next enemy from the spawn table, which must not be empty.
+    :param rng: The random generator to draw from
+    :return: The EntityType
+    """
+    # A single type needs no random draw, which keeps the spawn schedule the same
+    if len(spawn_types) == 1:
+        return spawn_types[0]
+
+    return rng.choices(spawn_types, cum_weights=spawn_weights)[0]
+
+
+def asset_lists():
+    """
+    Adds the images and sprite sheets of every entity type to the game's own.
+    :return: (dictionary of image name to (file name, size or None), tuple of sprite sheets)
+    """
+    images = dict(STATIC_IMAGES)
+    sheets = SPRITE_SHEETS
+    for entity_type in entity_types.values():
+        sheet = entity_type.sheet()
+        if sheet is None:
+            images[entity_type.name] = (entity_type.image_file, entity_type.image_size)
+        elif sheet not in sheets:
+            sheets += (sheet,)
+
+    return images, sheets
+
+
+def compile_entity_types(baked_images):
+    """
+    Gives every entity type its shared frames and masks and an empty pool.
+    :param baked_images: Dictionary of image name to the images loaded from the asset cache
+    :return: None
+    """
+    for entity_type in entity_types.values():
+        sheet = entity_type.sheet()
+        if sheet is None:
+            entity_type.frame_list = FrameList([baked_images[entity_type.name]])
+        else:
+            entity_type.frame_list = frame_cache.get(*sheet)
+        entity_type.reset_pool()
+
+
+def reset_entities():
+    """
+    Gives every entity type a new empty pool and switches off the array stores.
+    :return: None
+    """
+    for entity_type in entity_types.values():
+        entity_type.reset_pool()
+
+
+def array_stores():
+    """
+    :return: List of the enemy array stores followed by the fireball's, empty unless vectorized
+    """
+    if fireball_type.arrays is None:
+        return []
+
+    return [entity_type.arrays for entity_type in enemy_types] + [fireball_type.arrays]
+
+
+def enable_vectorized_projectiles():
+    """
+    Switches every entity type over to a NumPy array store.
+    :return: None
+    """
+    if ProjectileArrays is None:
+        raise RuntimeError("Vectorized projectiles need NumPy installed")
+
+    for entity_type in entity_types.values():
+        entity_type.arrays = ProjectileArrays(entity_type.frame_list, entity_type.speed, PROJECTILE_ARRAY_CAPACITY,
+                                              ANIMATION_INTERVAL, COLLISION_SWEEP_ROW_HEIGHT)
+
+
+class FrameList(list):
+    """
+    List of animation frames that also carries the collision mask of each frame.
+    """
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.masks = [pygame.mask.from_surface(frame) for frame in frames]
+
+
+class FrameCache:
+    """
+    Process-wide cache of sliced animation frames, keyed by (file, frame size, frame count).
+    Every sprite asking for the same sprite sheet shares one list of frames.
+    """
+    def __init__(self):
+        self.frames = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_name, frame_width, frame_height, frame_count):
+        """
+        Returns the frames for a sprite sheet, loading them from the asset cache only on a miss.
+        :param file_name: The name of the image file
+        :param frame_width: the width interval to cut the sprite sheet
+        :param frame_height: The height to cut the sprite sheet
+        :param frame_count: The number of frames in the sprite sheet
+        :return: List of the frames from the sprite sheet
+        """
+        key = (file_name, frame_width, frame_height, frame_count)
+        frame_list = self.frames.get(key)
+        if frame_list is None:
+            self.misses += 1
+            frame_list = load_baked_frames(file_name, frame_width, frame_height, frame_count)
+            self.frames[key] = frame_list
+        else:
+            self.hits += 1
+
+        return frame_list
+
+    def preload(self, file_name, frame_width, frame_height, frame_count, frames=None):
+        """
+        Puts a sprite sheet into the cache ahead of time so later spawns do no disk I/O.
+        :param frames: Frames already sliced, like the ones from the asset cache, or None to load them
+        :return: None
+        """
+        key = (file_name, frame_width, frame_height, frame_count)
+        if frames is not None:
+            self.frames[key] = FrameList(frames)
+        elif key not in self.frames:
+            self.misses += 1
+            self.frames[key] = load_baked_frames(file_name, frame_width, frame_height, frame_count)
+
+    def invalidate(self, file_name=None):
+        """
+        Drops cached frames and reloads them from the asset cache, which rebakes a changed
+        image. Entity types and live sprites are moved over to the reloaded frames.
+        :param file_name: Only reload frames cut from this file, or everything if None
+        :return: None
+        """
+        dropped = {key: frame_list for key, frame_list in self.frames.items()
+                   if file_name is None or key[0] == file_name}
+        for key in dropped:
+            del self.frames[key]
+
+        swap_frame_lists({id(frame_list): self.get(*key) for key, frame_list in dropped.items()})
+
+    def stats(self):
+        """
+        :return: Dictionary of the cache hit and miss counters and the number of cached sheets
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.frames)}
+
+
+frame_cache = FrameCache()
+
+
+def load_animation_frames(file_name, frame_width, frame_height, frame_count):
     """
     Separates the frames of the animation and puts them into a list.
     :param file_name: The name of the image file
     :param frame_width: the width interval to cut the sprite sheet
     :param frame_height: The height to cut the sprite sheet
     :param frame_count: The number of frames in the sprite sheet
-    :return: List of the frames from the sprite sheet
+    :return: FrameList of the frames from the sprite sheet and their masks
     """
-    sprite_sheet_image = pygame.image.load(file_name).convert_alpha()
+    return FrameList(assets.slice_sprite_sheet(file_name, frame_width, frame_height, frame_count, BLACK))
 
-    animation_frames = []
 
-    for frame in range(frame_count):
-        frame_surface = pygame.Surface((frame_width, frame_height)).convert_alpha()
-        frame_surface.blit(sprite_sheet_image, (0, 0), ((frame * frame_width), 0, frame_width, frame_height))
-        frame_surface.set_colorkey(BLACK)
-
-        animation_frames.append(frame_surface)
+def load_baked_frames(file_name, frame_width, frame_height, frame_count):
+    """
+    Loads the frames of a sprite sheet from the asset cache, rebaking it if an image changed.
+    Sheets the asset lists do not name are sliced from the image file instead.
+    :return: FrameList of the frames from the sprite sheet and their masks
+    """
+    sheet = (file_name, frame_width, frame_height, frame_count)
+    images, sheets = asset_lists()
+    if sheet not in sheets:
+        return load_animation_frames(*sheet)
 
-    return animation_frames
+    _, baked_sheets = assets.load_or_bake(ASSET_CACHE_FILE, images, sheets, BLACK)
+    return FrameList(baked_sheets[sheet])
 
 
-def animate_sprite(obj):
+def swap_frame_lists(replacements):
     """
-    Animates the sprite by updating its image based on the current frame.
-    :param obj: The sprite being displayed
+    Points the entity types, array stores and live sprites using a replaced frame list at
+    its new one. Pooled entities pick up their type's frames when they are reused.
+    :param replacements: Dictionary of id(old FrameList) to the new FrameList
     :return: None
     """
-    current_time = pygame.time.get_ticks()
-    if current_time - obj.last_time_frame_updated >= ANIMATION_INTERVAL:
-        obj.current_frame_index += 1
-        obj.last_time_frame_updated = current_time
-        if obj.current_frame_index >= len(obj.frame_list):
-            obj.current_frame_index = 0
+    for entity_type in entity_types.values():
+        frame_list = replacements.get(id(entity_type.frame_list))
+        if frame_list is not None:
+            entity_type.frame_list = frame_list
+            if entity_type.arrays is not None:
+                entity_type.arrays.frame_list = frame_list
+                entity_type.arrays.masks = frame_list.masks
+
+    for group in (dragon_group, boss_group, demon_group, fireball_group):
+        for sprite in group:
+            frame_list = replacements.get(id(sprite.frame_list))
+            if frame_list is not None:
+                sprite.frame_list = frame_list
+                sprite.image = frame_list[sprite.current_frame_index]
+                sprite.mask = frame_list.masks[sprite.current_frame_index]
+
+
+def init_animation_frames(file_name, frame_width, frame_height, frame_count):
+    """
+    Gets the frames of the animation from the shared frame cache.
+    :param file_name: The name of the image file
+    :param frame_width: the width interval to cut the sprite sheet
+    :param frame_height: The height to cut the sprite sheet
+    :param frame_count: The number of frames in the sprite sheet
+    :return: List of the frames from the sprite sheet, shared between sprites
+    """
+    return frame_cache.get(file_name, frame_width, frame_height, frame_count)
 
-        obj.image = obj.frame_list[obj.current_frame_index]
+
+def animate_sprites(sprites, current_time):
+    """
+    Works out every sprite's animation frame from how long it has been alive, and swaps
+    the image of only the sprites whose frame changed.
+    :param sprites: The sprites to animate
+    :param current_time: Current game time in milliseconds, read once for the whole step
+    :return: Number of sprites whose frame changed
+    """
+    changed = 0
+    for sprite in sprites:
+        frame_list = sprite.frame_list
+        frame_index = int((current_time - sprite.spawn_time) // ANIMATION_INTERVAL) % len(frame_list)
+        if frame_index != sprite.current_frame_index:
+            sprite.current_frame_index = frame_index
+            # Swap the mask along with the image so collisions test the frame on screen
+            sprite.image = frame_list[frame_index]
+            sprite.mask = frame_list.masks[frame_index]
+            changed += 1
+
+    return changed
+
+
+camera = Camera((0, 0, WINDOW_WIDTH, WINDOW_HEIGHT), CULL_NEAR_MARGIN, NEAR_UPDATE_INTERVAL, VIEWPORT_CULLING)
+
+
+def collision_bounds(sprite):
+    """
+    Gets the area a sprite's mask covers, which can be larger than its rect.
+    :param sprite: The sprite being tested
+    :return: Rect covering the sprite's mask
+    """
+    return pygame.Rect(sprite.rect.topleft, sprite.mask.get_size())
+
+
+def grid_cells(bounds):
+    """
+    Lists the broad-phase grid cells a rectangle overlaps.
+    :param bounds: The rectangle to place in the grid
+    :return: List of (column, row) cells
+    """
+    left = bounds.left // COLLISION_CELL_SIZE
+    right = (bounds.right - 1) // COLLISION_CELL_SIZE
+    top = bounds.top // COLLISION_CELL_SIZE
+    bottom = (bounds.bottom - 1) // COLLISION_CELL_SIZE
+    return [(column, row) for column in range(left, right + 1) for row in range(top, bottom + 1)]
+
+
+def grid_groupcollide(group_a, group_b, collided, stats):
+    """
+    Same as pygame.sprite.groupcollide with both kill flags set, but uses a uniform grid
+    so only sprites whose bounds overlap reach the collided test.
+    :param group_a: Group whose sprites are killed when they hit something
+    :param group_b: Group whose sprites are killed when they are hit
+    :param collided: Narrow-phase collision callback
+    :param stats: Dictionary that receives the number of candidate pairs, the pairs whose bounds
+                  did not overlap and the pairs whose bounds overlapped but masks did not
+    :return: Dictionary of each sprite in group_a to the list of sprites in group_b it hit
+    """
+    # Bucket group_b into the grid, remembering group order so results match groupcollide
+    grid = {}
+    order = {}
+    bounds_b = {}
+    for index, sprite_b in enumerate(group_b.sprites()):
+        order[sprite_b] = index
+        bounds_b[sprite_b] = collision_bounds(sprite_b)
+        for cell in grid_cells(bounds_b[sprite_b]):
+            grid.setdefault(cell, []).append(sprite_b)
+
+    candidates = 0
+    box_rejected = 0
+    mask_missed = 0
+    crashed = {}
+    for sprite_a in group_a.sprites():
+        bounds_a = collision_bounds(sprite_a)
+        nearby = set()
+        for cell in grid_cells(bounds_a):
+            nearby.update(grid.get(cell, ()))
+
+        hits = []
+        for sprite_b in sorted(nearby, key=order.get):
+            # Skip demons an earlier fireball already killed
+            if not group_b.has(sprite_b):
+                continue
+            candidates += 1
+            # Sharing a grid cell does not mean the bounds overlap
+            if not bounds_a.colliderect(bounds_b[sprite_b]):
+                box_rejected += 1
+                continue
+            if not collided(sprite_a, sprite_b):
+                mask_missed += 1
+                continue
+            hits.append(sprite_b)
+            sprite_b.kill()
+
+        if hits:
+            crashed[sprite_a] = hits
+            sprite_a.kill()
+
+    stats["candidates"] = candidates
+    stats["box_rejected"] = box_rejected
+    stats["mask_missed"] = mask_missed
+    return crashed
+
+
+collision_stats = {"candidates": 0, "box_rejected": 0, "mask_missed": 0}
 
 
 def check_collisions():
     """
     Checks for collisions between the fireball and demon
-    :return: None
+    :return: Number of demons killed
     """
-    if pygame.sprite.groupcollide(fireball_group, demon_group, True, True, pygame.sprite.collide_mask):
+    kills = 0
+    crashed = grid_groupcollide(fireball_group, demon_group, pygame.sprite.collide_mask, collision_stats)
+    if crashed:
         print("COLLISION")
+        audio_manager.play("hit")
+        kills += sum(len(demons) for demons in crashed.values())
 
+    if fireball_type.arrays is not None:
+        for enemy_type in enemy_types:
+            enemies_before = len(enemy_type.arrays)
+            if fireball_type.arrays.collide(enemy_type.arrays):
+                print("COLLISION")
+                audio_manager.play("hit")
+                kills += enemies_before - len(enemy_type.arrays)
 
-def main():
-    # Initialize animation frames and variables for dragon, boss, and demon
-    # Create boss and dragon sprites
+    return kills
+
+
+def draw_layers(*extra_groups):
+    """
+    Lists everything to draw, back to front, including the array stores when enabled.
+    :param extra_groups: Groups drawn on top of the game, like overlays
+    :return: Tuple of groups and array stores
+    """
+    layers = (dragon_group, boss_group, demon_group, fireball_group)
+    return layers + tuple(array_stores()) + extra_groups
+
+
+def step_simulation(dragon, boss, profiler):
+    """
+    Advances the game by one fixed simulation step.
+    :param dragon: The player's dragon
+    :param boss: The boss
+    :param profiler: FrameProfiler the update, collision and animation times are added to
+    :return: Number of demons killed during the step
+    """
+    background.update()
+
+    # Remember where every sprite was so drawing can interpolate towards the new position
+    for group in (dragon_group, boss_group, demon_group, fireball_group):
+        for sprite in group:
+            sprite.previous_pos = sprite.rect.topleft
+
+    # Update all sprites
+    dragon.update()
+    boss.update()
+    scheduler.run_due(game_time.steps)
+    demon_group.update()
+    fireball_group.update()
+    for arrays in array_stores():
+        arrays.update(-WORLD_MARGIN, WINDOW_WIDTH + WORLD_MARGIN)
+    profiler.mark("update")
+
+    kills = check_collisions()
+    profiler.mark("collisions")
+
+    # Animate the dragon, boss, and demons against one reading of the clock
+    current_time = game_time.get_ticks()
+    animate_sprites((dragon, boss), current_time)
+    # Frames come from the clock, so a sprite that was skipped shows the right frame once it is animated again
+    camera.advance()
+    animate_sprites(camera.due_for_update(demon_group), current_time)
+    for arrays in array_stores():
+        arrays.animate(current_time, camera.rows_due_for_update(arrays))
+    profiler.mark("animate")
+
+    game_input.end_tick()
+    game_time.tick()
+
+    return kills
+
+
+def scalable_images():
+    """
+    :return: List of every static image and animation frame the game draws
+    """
+    images = background.strips()
+    for entity_type in entity_types.values():
+        if entity_type.sheet() is None:
+            images.extend(entity_type.frame_list)
+    for frame_list in frame_cache.frames.values():
+        images.extend(frame_list)
+
+    return images
+
+
+def build_background(images):
+    """
+    Builds the background from BACKGROUND_LAYERS.
+    :param images: Dictionary of image name to the images loaded from the asset cache
+    :return: The Background
+    """
+    return Background([BackgroundLayer(images[name], speed, index == 0, (WINDOW_WIDTH, WINDOW_HEIGHT))
+                       for index, (name, speed) in enumerate(BACKGROUND_LAYERS)])
+
+
+def create_renderer():
+    """
+    Builds the renderer for the game window, culled by the camera and scaled from the playfield.
+    :return: The DirtyRenderer
+    """
+    view = ScaledView((WINDOW_WIDTH, WINDOW_HEIGHT), SCALED_SIZE_CACHE)
+    return DirtyRenderer(window, background, view, RenderQueue(camera), scalable_images,
+                         DIRTY_AREA_FULL_REDRAW_FRACTION, FULL_REDRAW)
+
+
+def startup():
+    """
+    Initializes the pygame subsystems the game uses, opens the window and loads the assets,
+    printing how long each phase took. The mixer is left to the audio manager.
+    :return: Dictionary of each phase to its time in milliseconds
+    """
+    global window, background
+    timings = {}
+    phase_start = time.perf_counter()
+
+    def finish_phase(phase):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[phase] = (now - phase_start) * 1000
+        phase_start = now
+
+    pygame.display.init()
+    pygame.font.init()
+    finish_phase("init")
+
+    window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("EvilClutches")
+    finish_phase("display")
+
+    # Load static images and sprite sheets, rebaking the asset cache if a source image changed
+    baked_images, baked_sheets = assets.load_or_bake(ASSET_CACHE_FILE, *asset_lists(), BLACK)
+    background = build_background(baked_images)
+    finish_phase("asset load")
+
+    # Build the frame lists and masks so spawning sprites does no disk I/O
+    for sheet, sheet_frames in baked_sheets.items():
+        frame_cache.preload(*sheet, sheet_frames)
+    compile_entity_types(baked_images)
+    finish_phase("frame slicing")
+
+    for phase, milliseconds in timings.items():
+        print(f"startup {phase}: {milliseconds:.1f} ms")
+
+    return timings
+
+
+def create_world():
+    """
+    Creates the boss and dragon sprites and puts them in their groups, dropping any
+    timers and camera steps left from an earlier world.
+    :return: (dragon, boss)
+    """
+    scheduler.clear()
+    camera.reset()
     dragon = Dragon()
     dragon_group.add(dragon)
 
     boss = Boss()
     boss_group.add(boss)
 
+    return dragon, boss
+
+
+def world_checksum():
+    """
+    Gets a checksum of where every sprite is, used to check a replay reproduced its session.
+    :return: CRC32 of the positions of every sprite and projectile
+    """
+    state = [tuple(sprite.rect) for group in (dragon_group, boss_group, demon_group, fireball_group)
+             for sprite in group]
+    for arrays in array_stores():
+        state.append((arrays.x[:arrays.count].tolist(), arrays.y[:arrays.count].tolist()))
+
+    return zlib.crc32(repr(state).encode())
+
+
+def main():
+    global game_input
+    startup()
+    audio_manager.start()
+    audio_manager.play_music()
+
+    if VECTORIZED_PROJECTILES:
+        enable_vectorized_projectiles()
+
+    events = EventDispatcher()
+    if isinstance(game_input, LiveInput):
+        game_input.listen(events)
+
+    if REPLAY_RECORD_FILE is not None:
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        game_input = RecordingInput(game_input, seed)
+
+    # Create boss and dragon sprites
+    dragon, boss = create_world()
+
+    renderer = create_renderer()
+    frame_count = 0
+
+    profiler = FrameProfiler(PROFILER_PHASES, PROFILER_WINDOW, PROFILER_CSV_FILE)
+    profiler_overlay = ProfilerOverlay(profiler, WHITE)
+    overlay_group = pygame.sprite.GroupSingle()
+
     running = True
+    new_size = None
+
+    def quit_game(event):
+        nonlocal running
+        running = False
+
+    def resize(event):
+        nonlocal new_size
+        # Only the last size matters when the window edge is being dragged
+        new_size = event.size
+
+    def toggle_overlay(event):
+        if overlay_group:
+            overlay_group.empty()
+        else:
+            profiler_overlay.update()
+            overlay_group.add(profiler_overlay)
+
+    events.bind_event(pygame.QUIT, quit_game)
+    events.bind_event(pygame.VIDEORESIZE, resize)
+    events.bind_event(pygame.VIDEOEXPOSE, lambda event: renderer.invalidate())
+    events.bind_key(PROFILER_OVERLAY_KEY, toggle_overlay)
+    events.allow_bound_events()
+
     clock = pygame.time.Clock()
+    step_seconds = SIMULATION_STEP_MS / 1000
+    accumulator = 0.0
+    previous_time = time.perf_counter()
     # Main game loop
     while running:
-        # Set frame rate
-        clock.tick(60)
+        profiler.start_frame()
 
-        # Handle events in game
-        for event in pygame.event.get(exclude=pygame.KEYDOWN):
-            if event.type == pygame.QUIT:
-                running = False
+        # Set frame rate and work out how much simulation time has to catch up
+        clock.tick(FRAME_CAP)
+        current_time = time.perf_counter()
+        accumulator += current_time - previous_time
+        previous_time = current_time
+        profiler.mark("wait")
 
-        # Display background image
-        window.blit(background_image, (0, 0))
+        # Handle events in game
+        new_size = None
+        events.pump()
+        if new_size is not None:
+            renderer.resize(new_size)
+        profiler.mark("input")
 
-        # Update all sprites
-        dragon.update()
-        boss.update()
-        demon_group.update()
-        fireball_group.update()
+        # Run as many fixed steps as the elapsed time covers
+        steps = 0
+        while accumulator >= step_seconds and steps < MAX_STEPS_PER_FRAME:
+            step_simulation(dragon, boss, profiler)
+            accumulator -= step_seconds
+            steps += 1
+            # Input played back from a replay ends with its recording, and so does the game
+            if game_input.finished():
+                running = False
+                break
 
-        # Draw all sprites
-        dragon_group.draw(window)
-        boss_group.draw(window)
-        demon_group.draw(window)
-        fireball_group.draw(window)
+        # Drop the backlog when too far behind rather than falling further behind
+        if steps == MAX_STEPS_PER_FRAME:
+            accumulator = min(accumulator, step_seconds)
 
-        check_collisions()
+        # Draw all sprites over the background and push the changed areas
+        renderer.draw(draw_layers(overlay_group), accumulator / step_seconds)
+        profiler.mark("draw")
 
-        # Animate the dragon, boss, and demons
-        animate_sprite(dragon)
-        animate_sprite(boss)
-        for demon_sprite in demon_group.sprites():
-            animate_sprite(demon_sprite)
+        frame_count += 1
+        if frame_count % AREA_REPORT_INTERVAL == 0:
+            pygame.display.set_caption(f"EvilClutches - {renderer.updated_area} px updated")
 
-        pygame.display.update()
+        profiler.end_frame()
+        if overlay_group and frame_count % PROFILER_REFRESH_INTERVAL == 0:
+            overlay_group.update()
 
+    profiler.close()
+    audio_manager.stop()
+    if REPLAY_RECORD_FILE is not None:
+        game_input.recording.checksum = world_checksum()
+        game_input.recording.save(REPLAY_RECORD_FILE)
     pygame.quit()
 
 
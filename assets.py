@@ -0,0 +1,242 @@
+"""
+Baked asset cache for EvilClutches.
+
+Decoding the PNGs and BMP, scaling the fireball and slicing the sprite sheets all happen
+once in a bake step. The results are written as raw RGBA pixel buffers to a single cache
+file, which later starts load with pygame.image.frombuffer straight out of a memory-mapped
+file. The cache is rebaked automatically when a source image's mtime changes.
+
+Run this file to bake the cache ahead of time: python assets.py
+"""
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+CACHE_MAGIC = b"ECAC"
+CACHE_VERSION = 1
+# Magic, version and header length
+CACHE_PREFIX = struct.Struct("<4sII")
+
+
+def slice_sprite_sheet(file_name, frame_width, frame_height, frame_count, colorkey):
+    """
+    Separates the frames of the animation and puts them into a list.
+    :param file_name: The name of the image file
+    :param frame_width: the width interval to cut the sprite sheet
+    :param frame_height: The height to cut the sprite sheet
+    :param frame_count: The number of frames in the sprite sheet
+    :param colorkey: Colour drawn as transparent
+    :return: List of the frames from the sprite sheet
+    """
+    sprite_sheet_image = pygame.image.load(file_name).convert_alpha()
+
+    animation_frames = []
+
+    for frame in range(frame_count):
+        frame_surface = pygame.Surface((frame_width, frame_height)).convert_alpha()
+        frame_surface.blit(sprite_sheet_image, (0, 0), ((frame * frame_width), 0, frame_width, frame_height))
+        frame_surface.set_colorkey(colorkey)
+
+        animation_frames.append(frame_surface)
+
+    return animation_frames
+
+
+def load_image(file_name, size=None):
+    """
+    Loads an image and scales it if a size is given.
+    :param file_name: The name of the image file
+    :param size: (width, height) to scale to, or None to keep the image's size
+    :return: The image
+    """
+    image = pygame.image.load(file_name).convert_alpha()
+    if size is not None:
+        image = pygame.transform.scale(image, size)
+
+    return image
+
+
+def source_files(images, sheets):
+    """
+    :return: Sorted list of every image file the assets are made from
+    """
+    return sorted({file_name for file_name, _ in images.values()} | {sheet[0] for sheet in sheets})
+
+
+def asset_spec(images, sheets):
+    """
+    :return: JSON-friendly description of the assets, stored so a changed spec triggers a rebake
+    """
+    return {"images": {name: [file_name, list(size) if size else None] for name, (file_name, size) in images.items()},
+            "sheets": [list(sheet) for sheet in sheets]}
+
+
+def bake(cache_file, images, sheets, colorkey):
+    """
+    Loads, scales and slices every asset and writes the pixels to the cache file.
+    :param cache_file: The cache file to write
+    :param images: Dictionary of image name to (file name, size or None)
+    :param sheets: List of (file name, frame width, frame height, frame count)
+    :param colorkey: Colour drawn as transparent in sprite sheet frames
+    :return: None
+    """
+    blobs = []
+    offset = 0
+
+    def add_surface(surface):
+        nonlocal offset
+        # tobytes reports colorkeyed pixels as transparent, so store the raw pixels instead
+        colorkey = surface.get_colorkey()
+        surface.set_colorkey(None)
+        data = pygame.image.tobytes(surface, "RGBA")
+        surface.set_colorkey(colorkey)
+        blobs.append(data)
+        entry = {"offset": offset, "length": len(data), "size": list(surface.get_size())}
+        offset += len(data)
+        return entry
+
+    header = {
+        "spec": asset_spec(images, sheets),
+        "sources": {file_name: os.path.getmtime(file_name) for file_name in source_files(images, sheets)},
+        "images": {name: add_surface(load_image(file_name, size)) for name, (file_name, size) in images.items()},
+        "sheets": [[add_surface(frame) for frame in slice_sprite_sheet(*sheet, colorkey)] for sheet in sheets],
+    }
+    header_bytes = json.dumps(header).encode()
+
+    # Write next to the old cache and rename so a reader never sees a partial file
+    temp_file = cache_file + ".tmp"
+    with open(temp_file, "wb") as cache:
+        cache.write(CACHE_PREFIX.pack(CACHE_MAGIC, CACHE_VERSION, len(header_bytes)))
+        cache.write(header_bytes)
+        for data in blobs:
+            cache.write(data)
+    os.replace(temp_file, cache_file)
+
+
+def read_header(cache_map):
+    """
+    :param cache_map: The memory-mapped cache file
+    :return: (header dictionary, offset of the pixel data), or None if the file is not a cache
+    """
+    if len(cache_map) < CACHE_PREFIX.size:
+        return None
+    magic, version, header_length = CACHE_PREFIX.unpack_from(cache_map)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+
+    data_start = CACHE_PREFIX.size + header_length
+    if data_start > len(cache_map):
+        return None
+    try:
+        header = json.loads(cache_map[CACHE_PREFIX.size:data_start])
+    except ValueError:
+        # A write cut short or a damaged file, so treat it like a stale cache
+        return None
+
+    return header, data_start
+
+
+def entries_fit(header, data_start, file_size):
+    """
+    Checks every pixel buffer the header lists lies inside the file.
+    :return: True if no buffer runs past the end of the file
+    """
+    entries = list(header["images"].values()) + [entry for frames in header["sheets"] for entry in frames]
+    return all(data_start + entry["offset"] + entry["length"] <= file_size for entry in entries)
+
+
+def is_fresh(header, images, sheets):
+    """
+    Checks the cache was baked from the same spec and unchanged source files.
+    :return: True if the cache can be used
+    """
+    if header["spec"] != asset_spec(images, sheets):
+        return False
+
+    for file_name, mtime in header["sources"].items():
+        if not os.path.exists(file_name) or os.path.getmtime(file_name) != mtime:
+            return False
+
+    return True
+
+
+def load(cache_file, images, sheets, colorkey):
+    """
+    Loads every asset from the cache file.
+    :param cache_file: The cache file to read
+    :param images: Dictionary of image name to (file name, size or None)
+    :param sheets: List of (file name, frame width, frame height, frame count)
+    :param colorkey: Colour drawn as transparent in sprite sheet frames
+    :return: (dictionary of name to image, dictionary of sheet to frame list), or None if stale
+    """
+    if not os.path.exists(cache_file):
+        return None
+
+    with open(cache_file, "rb") as cache:
+        try:
+            cache_map = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            return None
+
+    parsed = read_header(cache_map)
+    if (parsed is None or not is_fresh(parsed[0], images, sheets) or
+            not entries_fit(parsed[0], parsed[1], len(cache_map))):
+        cache_map.close()
+        return None
+    header, data_start = parsed
+    pixels = memoryview(cache_map)
+
+    def surface(entry):
+        start = data_start + entry["offset"]
+        # convert_alpha copies the pixels into the display's format, so nothing is decoded
+        return pygame.image.frombuffer(pixels[start:start + entry["length"]], entry["size"], "RGBA").convert_alpha()
+
+    loaded_images = {name: surface(header["images"][name]) for name in images}
+    loaded_sheets = {}
+    for sheet, entries in zip(sheets, header["sheets"]):
+        frames = [surface(entry) for entry in entries]
+        for frame in frames:
+            frame.set_colorkey(colorkey)
+        loaded_sheets[tuple(sheet)] = frames
+
+    # Every surface now owns a converted copy, so the mapping can be closed
+    pixels.release()
+    cache_map.close()
+    return loaded_images, loaded_sheets
+
+
+def load_or_bake(cache_file, images, sheets, colorkey):
+    """
+    Loads the assets from the cache, baking it first if it is missing or stale.
+    :return: (dictionary of name to image, dictionary of sheet to frame list)
+    """
+    loaded = load(cache_file, images, sheets, colorkey)
+    if loaded is None:
+        bake(cache_file, images, sheets, colorkey)
+        loaded = load(cache_file, images, sheets, colorkey)
+
+    return loaded
+
+
+if __name__ == "__main__":
+    import importlib.util
+    import sys
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+
+    # The game module holds the asset lists
+    spec = importlib.util.spec_from_file_location("evil_clutches", "EvilCLutches-Part-7.py")
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+
+    # convert_alpha needs a display to convert for
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    bake(game.ASSET_CACHE_FILE, *game.asset_lists(), game.BLACK)
+    print(f"Baked {game.ASSET_CACHE_FILE}")
@@ -0,0 +1,94 @@
+"""
+Audio for EvilClutches.
+
+Music is streamed from disk by pygame.mixer.music instead of being decoded into memory.
+Short sound effects are loaded into Sound objects once and played on a fixed set of
+mixer channels, so a burst of sounds can never pile up more than a few at a time.
+"""
+import pygame
+
+MUSIC_FILE = "Music.mp3"
+MUSIC_VOLUME = 0.5
+SOUND_FILES = {
+    "demon": "Demon.wav",
+    "hit": "Baby.wav",
+}
+# Most sounds playing at once, across all effects and per effect
+MAX_CHANNELS = 8
+MAX_PER_SOUND = 3
+
+
+class AudioManager:
+    def __init__(self, sound_files=SOUND_FILES, max_channels=MAX_CHANNELS, max_per_sound=MAX_PER_SOUND):
+        self.sound_files = sound_files
+        self.max_channels = max_channels
+        self.max_per_sound = max_per_sound
+        self.sounds = {}
+        self.enabled = False
+        self.dropped = 0
+
+    def start(self):
+        """
+        Starts the mixer if needed and loads the sound effects. Audio stays off if
+        there is no audio device.
+        :return: True if audio is on
+        """
+        if self.enabled:
+            return True
+
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+        except pygame.error:
+            return False
+
+        pygame.mixer.set_num_channels(self.max_channels)
+        self.sounds = {name: pygame.mixer.Sound(file_name) for name, file_name in self.sound_files.items()}
+        self.enabled = True
+        return True
+
+    def play_music(self, file_name=MUSIC_FILE, volume=MUSIC_VOLUME):
+        """
+        Streams a music file on a loop.
+        :param file_name: The music file
+        :param volume: Music volume from 0 to 1
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        pygame.mixer.music.load(file_name)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(-1)
+
+    def play(self, name):
+        """
+        Plays a sound effect on a free channel, or drops it if too many sounds are playing.
+        :param name: The sound effect's name in sound_files
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        sound = self.sounds[name]
+        if sound.get_num_channels() >= self.max_per_sound:
+            self.dropped += 1
+            return
+
+        channel = pygame.mixer.find_channel()
+        if channel is None:
+            self.dropped += 1
+            return
+
+        channel.play(sound)
+
+    def stop(self):
+        """
+        Stops the music and every sound effect.
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        pygame.mixer.music.stop()
+        pygame.mixer.stop()
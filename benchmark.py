@@ -0,0 +1,290 @@
+"""
+Headless benchmark for the EvilClutches game loop.
+
+Runs the Part-7 simulation under the SDL dummy video driver with a seeded random,
+the game's fixed-step simulation clock and a scripted input sequence, and reports
+frames/sec, per-phase times and peak sprite counts for each scenario.
+
+Usage: python benchmark.py --frames 600 --demons 10 100 1000
+       python benchmark.py --memory 10000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import pygame
+
+from harness import ScriptedInput, default_script, load_game, reset_world, silenced
+
+BENCHMARK_PHASES = ("update", "draw", "collisions", "animate")
+
+
+def live_counts(game):
+    """
+    :param game: The game module
+    :return: Number of live (demons, fireballs)
+    """
+    if game.fireball_type.arrays is not None:
+        return sum(len(enemy_type.arrays) for enemy_type in game.enemy_types), len(game.fireball_type.arrays)
+
+    return len(game.demon_group), len(game.fireball_group)
+
+
+def top_up_demons(game, rng, demon_count):
+    """
+    Spawns demons at random positions across the world until demon_count are alive.
+    :param game: The game module
+    :param rng: Seeded random generator used for placement
+    :param demon_count: Number of demons to keep alive
+    :return: None
+    """
+    for _ in range(demon_count - live_counts(game)[0]):
+        x_pos = rng.randrange(-game.WORLD_MARGIN, game.WINDOW_WIDTH + game.WORLD_MARGIN)
+        y_pos = rng.randrange(game.WINDOW_HEIGHT - game.BOSS_HEIGHT)
+        game.entity_types["demon"].spawn(x_pos, y_pos)
+
+
+def run_scenario(game, frames, demon_count, seed, draw=True, vectorized=False):
+    """
+    Runs the simulation for a number of frames and measures it.
+    :param game: The game module
+    :param frames: Number of frames to simulate
+    :param demon_count: Number of demons kept alive on every frame
+    :param seed: Seed for the game's random and the demon placement
+    :param draw: Whether to render each frame to the dummy display
+    :param vectorized: Whether to keep projectiles in NumPy array stores
+    :return: Dictionary of the scenario results
+    """
+    random.seed(seed)
+    rng = random.Random(seed)
+    script_input = ScriptedInput(default_script(game))
+    game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+    game.game_input = script_input
+    reset_world(game, vectorized)
+
+    dragon, boss = game.create_world()
+    renderer = game.create_renderer()
+    profiler = game.FrameProfiler(BENCHMARK_PHASES, frames)
+    layers = game.draw_layers()
+
+    peak_demons = 0
+    peak_fireballs = 0
+    cache_before = game.frame_cache.stats()
+    # The game prints on every hit, and terminal output is not part of what is measured
+    with silenced():
+        start = time.perf_counter()
+        for _ in range(frames):
+            profiler.start_frame()
+            top_up_demons(game, rng, demon_count)
+            peak_demons = max(peak_demons, live_counts(game)[0])
+
+            game.step_simulation(dragon, boss, profiler)
+            peak_fireballs = max(peak_fireballs, live_counts(game)[1])
+
+            if draw:
+                renderer.draw(layers)
+            profiler.mark("draw")
+
+            profiler.end_frame()
+
+    elapsed = time.perf_counter() - start
+    cache_after = game.frame_cache.stats()
+
+    return {
+        "demons": demon_count,
+        "vectorized": vectorized,
+        "frames": frames,
+        "fps": frames / elapsed if elapsed else float("inf"),
+        "phases": profiler.summary(),
+        "peak_demons": peak_demons,
+        "peak_fireballs": peak_fireballs,
+        "camera": dict(game.camera.counts),
+        # Every spawn looks its frames up in the frame cache, so misses here mean disk I/O
+        "frame_cache": {name: cache_after[name] - cache_before[name] for name in ("hits", "misses")},
+    }
+
+
+def compare_draw_paths(game, demon_count, seed, repeats):
+    """
+    Times drawing one world state with per-group Group.draw calls and with the render queue.
+    :param game: The game module
+    :param demon_count: Number of demons on screen
+    :param seed: Seed for the demon placement
+    :param repeats: Number of times each draw path is timed
+    :return: Dictionary of the average milliseconds per frame for each path
+    """
+    reset_world(game, False)
+    game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+    game.create_world()
+    top_up_demons(game, random.Random(seed), demon_count)
+    groups = (game.dragon_group, game.boss_group, game.demon_group, game.fireball_group)
+    window = game.window
+    view = game.ScaledView((game.WINDOW_WIDTH, game.WINDOW_HEIGHT), game.SCALED_SIZE_CACHE)
+    render_queue = game.RenderQueue()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        game.background.draw(window, view)
+        for group in groups:
+            group.draw(window)
+    per_group = (time.perf_counter() - start) / repeats * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        game.background.draw(window, view)
+        for layer, group in enumerate(groups):
+            render_queue.push_group(layer, group)
+        render_queue.flush(window)
+    queued = (time.perf_counter() - start) / repeats * 1000
+
+    return {"demons": demon_count, "per_group_ms": per_group, "render_queue_ms": queued}
+
+
+def compare_background_fill(game, repeats):
+    """
+    Times filling the window with the background as a per-pixel alpha blit of the whole
+    image, the way it used to be drawn, and through the opaque Background strips.
+    :param game: The game module
+    :param repeats: Number of times each fill is timed
+    :return: Dictionary of the average milliseconds per fill for each path
+    """
+    window = game.window
+    view = game.ScaledView((game.WINDOW_WIDTH, game.WINDOW_HEIGHT), game.SCALED_SIZE_CACHE)
+    alpha_image = game.background.layers[0].image.convert_alpha()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        window.blit(alpha_image, (0, 0))
+    alpha_blit = (time.perf_counter() - start) / repeats * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        game.background.draw(window, view)
+    strips = (time.perf_counter() - start) / repeats * 1000
+
+    return {"alpha_blit_ms": alpha_blit, "background_ms": strips}
+
+
+class UnslottedEntity(pygame.sprite.Sprite):
+    """
+    Sprite holding the same attributes as a game Entity but without __slots__, so the
+    memory benchmark can show what the slots save.
+    """
+    def __init__(self, entity, attributes):
+        super().__init__()
+        for name in attributes:
+            setattr(self, name, getattr(entity, name))
+        self.rect = entity.rect.copy()
+
+
+def measure_entity_memory(game, demon_count):
+    """
+    Measures the memory each live demon takes as a sprite in its group, as the same sprite
+    without __slots__, and as a row of the NumPy array store when NumPy is installed.
+    Frames and masks are shared by the demon type, so they are loaded before measuring
+    and not counted.
+    :param game: The game module
+    :param demon_count: Number of demons to spawn
+    :return: Dictionary of bytes per demon for each representation
+    """
+    demon_type = game.entity_types["demon"]
+    game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+    result = {"demons": demon_count}
+
+    for name, vectorized in (("sprite", False), ("arrays", True)):
+        if vectorized and game.ProjectileArrays is None:
+            continue
+        reset_world(game, False)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        # The array store is created while tracing so its preallocated capacity is counted
+        reset_world(game, vectorized)
+        for index in range(demon_count):
+            demon_type.spawn(index % game.WINDOW_WIDTH, index % game.WINDOW_HEIGHT)
+        result[name] = (tracemalloc.get_traced_memory()[0] - before) / demon_count
+        tracemalloc.stop()
+
+        if not vectorized:
+            # Copy the live demons onto sprites without __slots__, in a group of their own
+            attributes = [name for cls in (game.Entity, game.Projectile) for name in cls.__slots__]
+            demons = list(game.demon_group)
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            unslotted_group = pygame.sprite.Group(UnslottedEntity(demon, attributes) for demon in demons)
+            result["unslotted"] = (tracemalloc.get_traced_memory()[0] - before) / demon_count
+            tracemalloc.stop()
+            unslotted_group.empty()
+
+    reset_world(game, False)
+    return result
+
+
+def print_results(results):
+    """
+    Prints one block of results per scenario.
+    :param results: List of scenario results from run_scenario
+    :return: None
+    """
+    for result in results:
+        print(f"demons={result['demons']} vectorized={result['vectorized']} frames={result['frames']} fps={result['fps']:.1f} "
+              f"peak_demons={result['peak_demons']} peak_fireballs={result['peak_fireballs']} " +
+              " ".join(f"{name}={count}" for name, count in result["camera"].items()) +
+              f" frame_cache_hits={result['frame_cache']['hits']} frame_cache_misses={result['frame_cache']['misses']}")
+        for phase, (low, average, p99) in result["phases"].items():
+            print(f"    {phase:<10} min {low:7.3f}  avg {average:7.3f}  p99 {p99:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless EvilClutches game loop benchmark")
+    parser.add_argument("--frames", type=int, default=600, help="frames to simulate per scenario")
+    parser.add_argument("--demons", type=int, nargs="+", default=[10, 100, 1000],
+                        help="live demon counts to benchmark")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--no-draw", action="store_true", help="skip rendering")
+    parser.add_argument("--vectorized", action="store_true", help="keep projectiles in NumPy array stores")
+    parser.add_argument("--world-margin", type=int, default=0,
+                        help="pixels past the window edges demons are spread over and kept alive in")
+    parser.add_argument("--no-cull", action="store_true", help="animate and draw off-screen sprites too")
+    parser.add_argument("--compare-draw", action="store_true",
+                        help="compare per-group draws with the batched render queue")
+    parser.add_argument("--compare-background", action="store_true",
+                        help="compare the old alpha background blit with the opaque background strips")
+    parser.add_argument("--memory", type=int, nargs="?", const=10000, metavar="DEMONS",
+                        help="report bytes per live demon, at 10000 demons by default")
+    args = parser.parse_args()
+
+    game = load_game()
+    game.WORLD_MARGIN = args.world_margin
+    game.camera.culling = not args.no_cull
+    if args.compare_background:
+        result = compare_background_fill(game, args.frames)
+        print(f"background fill: alpha blit {result['alpha_blit_ms']:.3f} ms  "
+              f"opaque strips {result['background_ms']:.3f} ms")
+        return
+
+    if args.memory:
+        result = measure_entity_memory(game, args.memory)
+        print(f"demons={result['demons']} " +
+              "  ".join(f"{name} {result[name]:.0f} bytes/demon" for name in ("sprite", "unslotted", "arrays")
+                        if name in result))
+        print(f"__slots__ save {result['unslotted'] - result['sprite']:.0f} bytes/demon over a sprite without them")
+        return
+
+    if args.compare_draw:
+        for demon_count in args.demons:
+            result = compare_draw_paths(game, demon_count, args.seed, args.frames)
+            print(f"demons={result['demons']} per-group {result['per_group_ms']:.3f} ms  "
+                  f"render queue {result['render_queue_ms']:.3f} ms")
+        return
+
+    results = [run_scenario(game, args.frames, demon_count, args.seed, not args.no_draw, args.vectorized)
+               for demon_count in args.demons]
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
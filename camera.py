@@ -0,0 +1,142 @@
+"""
+Viewport camera for EvilClutches.
+
+The camera sorts sprites, or the rows of a projectile array store, into visible, near and
+far by how far they are from the window. Work that only shows on screen is done for visible
+sprites every step, for near sprites every few steps and for far sprites not at all.
+"""
+import pygame
+
+
+class Camera:
+    """
+    Viewport onto the world. advance() is called once per simulation step, before anything
+    asks which sprites are due for an update.
+    """
+    def __init__(self, viewport, near_margin, near_interval, culling=True):
+        self.viewport = pygame.Rect(viewport)
+        self.near_area = self.viewport.inflate(near_margin * 2, near_margin * 2)
+        self.near_interval = near_interval
+        self.culling = culling
+        self.steps = 0
+        self.counts = {"visible": 0, "near": 0, "far": 0}
+
+    def reset(self):
+        """
+        Starts counting steps again for a new world, so near sprites are updated on the same
+        steps every time a world is replayed.
+        :return: None
+        """
+        self.steps = 0
+        self.counts = {"visible": 0, "near": 0, "far": 0}
+
+    def advance(self):
+        """
+        Moves on to the next simulation step and clears the counts from the last one.
+        :return: None
+        """
+        self.steps += 1
+        self.counts = {"visible": 0, "near": 0, "far": 0}
+
+    def near_due(self):
+        """
+        :return: Whether near sprites are updated on this step
+        """
+        return self.steps % self.near_interval == 0
+
+    def count(self, visible, near, total):
+        """
+        Adds one classification to this step's counts.
+        :param visible: Number of visible sprites
+        :param near: Number of near sprites
+        :param total: Number of sprites classified
+        :return: None
+        """
+        self.counts["visible"] += visible
+        self.counts["near"] += near
+        self.counts["far"] += total - visible - near
+
+    def visible(self, sprites):
+        """
+        :param sprites: The sprites to check
+        :return: List of the sprites inside the viewport
+        """
+        if not self.culling:
+            return list(sprites)
+
+        sprites = list(sprites)
+        return [sprites[index] for index in self.viewport.collidelistall([sprite.rect for sprite in sprites])]
+
+    def classify(self, sprites):
+        """
+        Sorts sprites by how far they are from the viewport.
+        :param sprites: The sprites to sort
+        :return: (list of visible sprites, list of near sprites)
+        """
+        sprites = list(sprites)
+        if not self.culling:
+            self.count(len(sprites), 0, len(sprites))
+            return sprites, []
+
+        rects = [sprite.rect for sprite in sprites]
+        visible_indices = set(self.viewport.collidelistall(rects))
+        visible = [sprites[index] for index in sorted(visible_indices)]
+        near = [sprites[index] for index in self.near_area.collidelistall(rects) if index not in visible_indices]
+        self.count(len(visible), len(near), len(sprites))
+        return visible, near
+
+    def due_for_update(self, sprites):
+        """
+        Picks the sprites to animate on this simulation step.
+        :param sprites: The sprites that could be animated
+        :return: The visible sprites, plus the near ones every near_interval steps
+        """
+        visible, near = self.classify(sprites)
+        if near and self.near_due():
+            visible.extend(near)
+
+        return visible
+
+    @staticmethod
+    def rows_inside(area, arrays):
+        """
+        Tests every live row of a projectile array store against an area, the same way
+        Rect.colliderect tests a sprite's rect.
+        :param area: Rect to test against
+        :param arrays: The projectile array store
+        :return: Boolean array with one entry per live row
+        """
+        x_pos = arrays.x[:arrays.count]
+        y_pos = arrays.y[:arrays.count]
+        return ((x_pos < area.right) & (x_pos + arrays.width > area.left) &
+                (y_pos < area.bottom) & (y_pos + arrays.height > area.top))
+
+    def visible_rows(self, arrays):
+        """
+        :param arrays: The projectile array store to check
+        :return: Boolean array marking the live rows inside the viewport, or None when
+                 culling is off and every row counts as visible
+        """
+        if not self.culling:
+            return None
+
+        return self.rows_inside(self.viewport, arrays)
+
+    def rows_due_for_update(self, arrays):
+        """
+        Picks the rows of a projectile array store to animate on this simulation step.
+        :param arrays: The projectile array store
+        :return: Boolean array marking the visible rows, plus the near ones every
+                 near_interval steps, or None when culling is off and every row is due
+        """
+        if not self.culling:
+            self.count(arrays.count, 0, arrays.count)
+            return None
+
+        visible = self.rows_inside(self.viewport, arrays)
+        near = self.rows_inside(self.near_area, arrays) & ~visible
+        self.count(int(visible.sum()), int(near.sum()), arrays.count)
+        if self.near_due():
+            return visible | near
+
+        return visible
@@ -0,0 +1,57 @@
+"""
+Event pump for EvilClutches.
+
+pygame's event queue is read once per frame and each event is handed to whatever is bound
+to its type or key, instead of every system polling pygame for the state it cares about.
+"""
+import pygame
+
+
+class EventDispatcher:
+    """
+    Pumps the event queue once per frame and hands each event to the callbacks bound to
+    its type, and key events also to the callbacks bound to their key.
+    """
+    def __init__(self):
+        self.event_handlers = {}
+        self.key_handlers = {}
+
+    def bind_event(self, event_type, callback):
+        """
+        Calls callback(event) for every event of a type.
+        :param event_type: The pygame event type
+        :param callback: Function taking the event
+        :return: None
+        """
+        self.event_handlers.setdefault(event_type, []).append(callback)
+
+    def bind_key(self, key, callback, event_type=pygame.KEYUP):
+        """
+        Calls callback(event) when a key is pressed or released.
+        :param key: The pygame key constant
+        :param callback: Function taking the event
+        :param event_type: pygame.KEYDOWN or pygame.KEYUP
+        :return: None
+        """
+        self.key_handlers.setdefault((event_type, key), []).append(callback)
+
+    def allow_bound_events(self):
+        """
+        Blocks every event type nothing is bound to, so unused events never fill the queue.
+        :return: None
+        """
+        event_types = set(self.event_handlers) | {event_type for event_type, _ in self.key_handlers}
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(sorted(event_types))
+
+    def pump(self):
+        """
+        Takes every event off the queue in one pass and dispatches it.
+        :return: None
+        """
+        for event in pygame.event.get():
+            for callback in self.event_handlers.get(event.type, ()):
+                callback(event)
+            if event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
+                for callback in self.key_handlers.get((event.type, event.key), ()):
+                    callback(event)
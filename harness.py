@@ -0,0 +1,119 @@
+"""
+Shared harness for running EvilClutches without a player.
+
+The benchmark, replay and batch simulation tools all load the Part-7 game as a module,
+reset its world between runs and drive it from input sources other than the keyboard.
+The pieces they share live here.
+"""
+import contextlib
+import importlib.util
+import os
+import sys
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+GAME_FILE = os.path.join(GAME_DIR, "EvilCLutches-Part-7.py")
+
+
+class KeyState:
+    """
+    Snapshot of the held keys that answers keys[pygame.K_...] like pygame.key.get_pressed().
+    Shared by the live, recorded, scripted and policy input sources.
+    """
+    def __init__(self, held_keys):
+        self.held_keys = held_keys
+
+    def __getitem__(self, key):
+        return key in self.held_keys
+
+
+def load_game(headless=True, start=True):
+    """
+    Imports the Part-7 game module and runs its startup.
+    :param headless: Whether to use the SDL dummy drivers instead of a real window
+    :param start: Whether to run startup, which the game's main() does itself
+    :return: The game module
+    """
+    if headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # The game loads its images by relative path
+    os.chdir(GAME_DIR)
+
+    if "evil_clutches" in sys.modules:
+        return sys.modules["evil_clutches"]
+
+    spec = importlib.util.spec_from_file_location("evil_clutches", GAME_FILE)
+    game = importlib.util.module_from_spec(spec)
+    sys.modules["evil_clutches"] = game
+    spec.loader.exec_module(game)
+    if start:
+        game.startup()
+    return game
+
+
+class ScriptedInput:
+    """
+    Replays a looping list of (held keys, pressed keys) steps, one step per frame.
+    """
+    def __init__(self, script):
+        self.script = [(KeyState(frozenset(held)), list(pressed)) for held, pressed in script]
+        self.frame = 0
+
+    def end_tick(self):
+        """
+        Moves on to the next step of the script after each simulation step.
+        :return: None
+        """
+        self.frame += 1
+
+    def key_presses(self):
+        """
+        :return: List of the keys pressed on this frame
+        """
+        return self.script[self.frame % len(self.script)][1]
+
+    def get_pressed(self):
+        """
+        :return: The keys held on this frame
+        """
+        return self.script[self.frame % len(self.script)][0]
+
+
+def default_script(game):
+    """
+    Builds an input script that sweeps the dragon down and up while firing every 5 frames.
+    :param game: The game module
+    :return: List of (held keys, pressed keys) steps
+    """
+    script = []
+    for frame in range(120):
+        held = [game.pygame.K_s] if frame < 60 else [game.pygame.K_w]
+        pressed = [game.pygame.K_SPACE] if frame % 5 == 0 else []
+        script.append((held, pressed))
+
+    return script
+
+
+def reset_world(game, vectorized):
+    """
+    Empties the sprite groups, pools and array stores so each scenario starts from the same state.
+    :param game: The game module
+    :param vectorized: Whether projectiles are kept in NumPy array stores
+    :return: None
+    """
+    for group in (game.dragon_group, game.boss_group, game.demon_group, game.fireball_group):
+        group.empty()
+
+    game.reset_entities()
+    if vectorized:
+        game.enable_vectorized_projectiles()
+
+
+@contextlib.contextmanager
+def silenced():
+    """
+    Sends the game's console output, like the line printed on every hit, to os.devnull
+    so it does not slow down or clutter a headless run.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
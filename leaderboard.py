@@ -0,0 +1,209 @@
+"""
+Leaderboard store for EvilClutches.
+
+Scores are kept in a sorted in-memory index, so inserting a score and reading the top
+entries cost O(log n) searches instead of re-ranking every entry. New scores are appended
+to a log file, and the log is folded back into leaderboard.json every so often, so saving
+a score never rewrites the whole file.
+
+AsyncLeaderboard runs all of this on a background thread so the game loop never waits
+on file I/O.
+"""
+import bisect
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+SNAPSHOT_FILE = "leaderboard.json"
+LOG_FILE = "leaderboard.log"
+# Number of logged scores before the log is compacted into the snapshot
+COMPACT_INTERVAL = 1000
+
+
+class Leaderboard:
+    def __init__(self, snapshot_file=SNAPSHOT_FILE, log_file=LOG_FILE, compact_interval=COMPACT_INTERVAL):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.compact_interval = compact_interval
+        # Sorted (-score, order, name) tuples; order keeps earlier scores ahead on ties
+        self.index = []
+        self.next_order = 0
+        self.logged_count = 0
+        self.log = None
+        self.loaded = False
+
+    def load(self):
+        """
+        Loads the snapshot and replays any scores logged since it was written.
+        :return: None
+        """
+        self.loaded = True
+        self.index = []
+        self.next_order = 0
+        self.logged_count = 0
+
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file) as snapshot:
+                entries = json.load(snapshot)
+            for entry in sorted(entries, key=lambda entry: entry["position"]):
+                self.insert(entry["name"], entry["score"])
+
+        if os.path.exists(self.log_file):
+            with open(self.log_file) as log:
+                for line in log:
+                    # A torn last line from a crash mid-write is skipped
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Scores already in the snapshot are left over from an interrupted compaction
+                    if entry["order"] < self.next_order:
+                        continue
+                    self.insert(entry["name"], entry["score"])
+                    self.logged_count += 1
+
+    def ensure_loaded(self):
+        """
+        Loads the leaderboard if it has not been loaded yet. Without this a score added first
+        would be logged with an order the next load skips, and a compaction would overwrite
+        the snapshot with only the new scores.
+        :return: None
+        """
+        if not self.loaded:
+            self.load()
+
+    def insert(self, name, score):
+        """
+        Adds a score to the in-memory index only.
+        :param name: The player's name
+        :param score: The player's score
+        :return: The score's position, starting at 1
+        """
+        record = (-score, self.next_order, name)
+        self.next_order += 1
+        index = bisect.bisect_left(self.index, record)
+        self.index.insert(index, record)
+        return index + 1
+
+    def add(self, name, score):
+        """
+        Adds a score and appends it to the log, compacting the log when it gets long.
+        :param name: The player's name
+        :param score: The player's score
+        :return: The score's position, starting at 1
+        """
+        self.ensure_loaded()
+        order = self.next_order
+        position = self.insert(name, score)
+        if self.log is None:
+            self.log = open(self.log_file, "a")
+        self.log.write(json.dumps({"name": name, "score": score, "order": order}) + "\n")
+        self.log.flush()
+        self.logged_count += 1
+
+        if self.logged_count >= self.compact_interval:
+            self.compact()
+
+        return position
+
+    def position_of(self, score):
+        """
+        Gets the position a new score would be placed at.
+        :param score: The score to look up
+        :return: The position, starting at 1
+        """
+        self.ensure_loaded()
+        # Ties go after the existing entries with the same score
+        return bisect.bisect_left(self.index, (-score, self.next_order)) + 1
+
+    def top(self, count):
+        """
+        Gets the best scores.
+        :param count: Number of entries to return
+        :return: List of {"name", "score", "position"} dictionaries
+        """
+        self.ensure_loaded()
+        return [{"name": name, "score": -negative_score, "position": position}
+                for position, (negative_score, _, name) in enumerate(self.index[:count], start=1)]
+
+    def entries(self):
+        """
+        :return: List of every entry in leaderboard.json's format
+        """
+        return self.top(len(self.index))
+
+    def compact(self):
+        """
+        Writes every entry to the snapshot file and empties the log.
+        The snapshot is written to a temporary file and renamed over the old one,
+        so a crash never leaves a half-written leaderboard.json.
+        :return: None
+        """
+        self.ensure_loaded()
+        directory = os.path.dirname(os.path.abspath(self.snapshot_file))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as snapshot:
+            json.dump(self.entries(), snapshot)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(snapshot.name, self.snapshot_file)
+
+        self.close()
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self.logged_count = 0
+
+    def close(self):
+        """
+        Closes the log file if it is open.
+        :return: None
+        """
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.index)
+
+
+class AsyncLeaderboard:
+    """
+    Runs leaderboard loads and saves on a single background thread. Every call returns a
+    Future straight away, and calls run in the order they were made.
+    """
+    def __init__(self, leaderboard=None):
+        self.leaderboard = leaderboard if leaderboard is not None else Leaderboard()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leaderboard")
+
+    def load(self):
+        """
+        :return: Future that finishes once the leaderboard is loaded
+        """
+        return self.executor.submit(self.leaderboard.load)
+
+    def add(self, name, score):
+        """
+        :return: Future of the score's position
+        """
+        return self.executor.submit(self.leaderboard.add, name, score)
+
+    def top(self, count):
+        """
+        :return: Future of the list of the best entries
+        """
+        return self.executor.submit(self.leaderboard.top, count)
+
+    def compact(self):
+        """
+        :return: Future that finishes once the snapshot is written
+        """
+        return self.executor.submit(self.leaderboard.compact)
+
+    def close(self):
+        """
+        Waits for pending writes to finish and closes the log file.
+        :return: None
+        """
+        self.executor.submit(self.leaderboard.close)
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,117 @@
+"""
+Frame profiler for EvilClutches.
+
+Each phase of the main loop is timed with perf_counter and kept in a rolling window, which
+can be shown as an overlay in the window or written out frame by frame as CSV.
+"""
+import csv
+import time
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Times each phase of the main loop and keeps a rolling window of the results.
+    """
+    def __init__(self, phases, window_size, csv_file=None):
+        self.phases = phases
+        self.samples = {phase: deque(maxlen=window_size) for phase in phases + ("frame",)}
+        self.current = {}
+        self.frame_start = 0
+        self.last_mark = 0
+        self.frame_number = 0
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_file is not None:
+            self.csv_file = open(csv_file, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(("frame",) + tuple(f"{phase}_ms" for phase in phases) + ("total_ms",))
+
+    def start_frame(self):
+        """
+        Starts timing a new frame.
+        :return: None
+        """
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Adds the time since the last mark to a phase.
+        :param phase: The phase that just finished
+        :return: None
+        """
+        now = time.perf_counter()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        """
+        Records the finished frame in the rolling window and the CSV file.
+        :return: None
+        """
+        self.current["frame"] = self.last_mark - self.frame_start
+        for phase, seconds in self.current.items():
+            self.samples[phase].append(seconds * 1000)
+
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frame_number] +
+                                     [f"{self.current[phase] * 1000:.3f}" for phase in self.phases] +
+                                     [f"{self.current['frame'] * 1000:.3f}"])
+        self.frame_number += 1
+
+    def summary(self):
+        """
+        :return: Dictionary of each phase to its (min, avg, p99) time in milliseconds
+        """
+        results = {}
+        for phase, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            results[phase] = (ordered[0], sum(ordered) / len(ordered), p99)
+
+        return results
+
+    def close(self):
+        """
+        Closes the CSV file if one is being written.
+        :return: None
+        """
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
+
+class ProfilerOverlay(pygame.sprite.Sprite):
+    """
+    Sprite showing a FrameProfiler's rolling timings in the corner of the window.
+    """
+    def __init__(self, profiler, color):
+        super().__init__()
+        self.profiler = profiler
+        self.color = color
+        self.font = pygame.font.Font(None, 20)
+        self.line_height = self.font.get_linesize()
+        self.image = pygame.Surface((0, 0))
+        self.rect = pygame.Rect(4, 4, 0, 0)
+
+    def update(self):
+        """
+        Renders the profiler's rolling min/avg/p99 times as text.
+        :return: None
+        """
+        lines = ["phase       min    avg    p99 (ms)"]
+        for phase, (low, average, p99) in self.profiler.summary().items():
+            lines.append(f"{phase:<10} {low:6.2f} {average:6.2f} {p99:6.2f}")
+
+        text_surfaces = [self.font.render(line, True, self.color) for line in lines]
+        width = max(text.get_width() for text in text_surfaces)
+        self.image = pygame.Surface((width + 8, self.line_height * len(lines) + 8))
+        for index, text in enumerate(text_surfaces):
+            self.image.blit(text, (4, 4 + index * self.line_height))
+        self.rect.size = self.image.get_size()
@@ -0,0 +1,187 @@
+"""
+NumPy projectile store for EvilClutches.
+
+Very large numbers of fireballs and demons are kept in parallel NumPy arrays instead of one
+sprite each, so moving, culling, animating and collision tests run as whole-array operations.
+"""
+import numpy as np
+
+
+class ProjectileArrays:
+    """
+    Structure-of-arrays store for one projectile type. Live projectiles are packed at the
+    front of the arrays so moving, culling, animating and AABB tests are single NumPy operations.
+    """
+    def __init__(self, frame_list, speed, capacity, frame_interval, row_height):
+        """
+        :param frame_list: FrameList of the projectile's animation
+        :param speed: Horizontal speed of new projectiles
+        :param capacity: Number of projectiles the arrays hold before they grow
+        :param frame_interval: Milliseconds each animation frame is shown for
+        :param row_height: Height of the rows collide buckets projectiles into before sweeping along x
+        """
+        self.frame_list = frame_list
+        self.frame_interval = frame_interval
+        self.row_height = row_height
+        self.masks = frame_list.masks
+        self.width, self.height = frame_list[0].get_size()
+        self.count = 0
+        self.x = np.zeros(capacity, np.int32)
+        self.y = np.zeros(capacity, np.int32)
+        self.speed = np.full(capacity, speed, np.int32)
+        self.spawn_time = np.zeros(capacity, np.int64)
+        self.frame_index = np.zeros(capacity, np.int32)
+        self.alive = np.zeros(capacity, bool)
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        """
+        Doubles the capacity of every array.
+        :return: None
+        """
+        for name in ("x", "y", "speed", "spawn_time", "frame_index", "alive"):
+            array = getattr(self, name)
+            grown = np.zeros(len(array) * 2, array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def spawn(self, x_pos, y_pos, speed, spawn_time):
+        """
+        Adds a projectile at the end of the live range.
+        :param x_pos: x position of the projectile
+        :param y_pos: y position of the projectile
+        :param speed: Horizontal speed of the projectile
+        :param spawn_time: Game time in milliseconds the projectile's animation starts from
+        :return: None
+        """
+        if self.count == len(self.x):
+            self.grow()
+        index = self.count
+        self.x[index] = int(x_pos)
+        self.y[index] = int(y_pos)
+        self.speed[index] = speed
+        self.spawn_time[index] = spawn_time
+        self.frame_index[index] = 0
+        self.alive[index] = True
+        self.count += 1
+
+    def compact(self):
+        """
+        Packs the projectiles that are still alive to the front of the arrays.
+        :return: None
+        """
+        keep = self.alive[:self.count]
+        live = int(keep.sum())
+        if live == self.count:
+            return
+        for array in (self.x, self.y, self.speed, self.spawn_time, self.frame_index):
+            array[:live] = array[:self.count][keep]
+        self.alive[:live] = True
+        self.alive[live:self.count] = False
+        self.count = live
+
+    def update(self, left, right):
+        """
+        Moves every projectile and removes the ones that left the world.
+        :param left: x coordinate of the world's left edge
+        :param right: x coordinate of the world's right edge
+        :return: None
+        """
+        count = self.count
+        self.x[:count] += self.speed[:count]
+        self.alive[:count] &= (self.x[:count] >= left - self.width) & (self.x[:count] <= right)
+        self.compact()
+
+    def animate(self, current_time, rows=None):
+        """
+        Works out each projectile's animation frame from how long it has been alive.
+        :param current_time: Current game time in milliseconds
+        :param rows: Boolean array picking the live rows to animate, or None for every row
+        :return: None
+        """
+        if rows is None:
+            rows = slice(0, self.count)
+        else:
+            rows = np.flatnonzero(rows)
+        elapsed = current_time - self.spawn_time[rows]
+        self.frame_index[rows] = (elapsed // self.frame_interval) % len(self.frame_list)
+
+    def collide(self, other):
+        """
+        Kills every pair of projectiles whose masks overlap, the same way as
+        groupcollide with both kill flags set.
+        :param other: The store of projectiles this one can hit
+        :return: Number of projectiles in this store that hit something
+        """
+        if self.count == 0 or other.count == 0:
+            return 0
+
+        # Broad phase: sort the other store into rows by y and by x within a row, then sweep
+        # each projectile here over the x range of every row its height spans, so only pairs
+        # that are already close get materialised instead of a count x count matrix
+        x_a = self.x[:self.count]
+        y_a = self.y[:self.count]
+        x_b = other.x[:other.count]
+        y_b = other.y[:other.count]
+        x_origin = int(min(x_a.min(), x_b.min())) - other.width
+        row_stride = int(max(x_a.max(), x_b.max())) - x_origin + self.width + 1
+        keys = (y_b // self.row_height).astype(np.int64) * row_stride + (x_b - x_origin)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        first_row = (y_a - other.height + 1) // self.row_height
+        last_row = (y_a + self.height - 1) // self.row_height
+        row_span = (self.height + other.height - 2) // self.row_height + 2
+        rows = first_row[:, None] + np.arange(row_span)
+        row_keys = rows.astype(np.int64) * row_stride
+        first = np.searchsorted(sorted_keys, row_keys + (x_a - other.width - x_origin)[:, None], side="right")
+        last = np.searchsorted(sorted_keys, row_keys + (x_a + self.width - x_origin)[:, None], side="left")
+        counts = np.where(rows <= last_row[:, None], np.maximum(last - first, 0), 0).ravel()
+        total = int(counts.sum())
+        if total == 0:
+            return 0
+
+        # Candidates come out grouped by this store's index, like groupcollide's iteration
+        candidates_a = np.repeat(np.repeat(np.arange(self.count), row_span), counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        candidates_b = order[np.repeat(first.ravel(), counts) + np.arange(total) - run_starts]
+        in_range = ((y_a[candidates_a] < y_b[candidates_b] + other.height) &
+                    (y_b[candidates_b] < y_a[candidates_a] + self.height))
+        candidates_a = candidates_a[in_range]
+        candidates_b = candidates_b[in_range]
+
+        hits = 0
+        hit_index = -1
+        for index_a, index_b in zip(candidates_a.tolist(), candidates_b.tolist()):
+            if not other.alive[index_b]:
+                continue
+            offset = (int(other.x[index_b] - self.x[index_a]), int(other.y[index_b] - self.y[index_a]))
+            if self.masks[self.frame_index[index_a]].overlap(other.masks[other.frame_index[index_b]], offset):
+                other.alive[index_b] = False
+                self.alive[index_a] = False
+                if index_a != hit_index:
+                    hits += 1
+                    hit_index = index_a
+
+        self.compact()
+        other.compact()
+        return hits
+
+    def blit_sequence(self, alpha=1.0, rows=None):
+        """
+        Lists what to draw for each projectile, interpolated between simulation steps.
+        :param alpha: Fraction of a simulation step since the last update, from 0 to 1
+        :param rows: Boolean array picking the live rows to draw, or None for every row
+        :return: List of (image, position) pairs for Surface.blits
+        """
+        if rows is None:
+            rows = slice(0, self.count)
+        else:
+            rows = np.flatnonzero(rows)
+        draw_x = self.x[rows] - (self.speed[rows] * (1 - alpha)).astype(np.int32)
+        frames = self.frame_list
+        return [(frames[frame], (x_pos, y_pos))
+                for frame, x_pos, y_pos in zip(self.frame_index[rows].tolist(), draw_x.tolist(),
+                                               self.y[rows].tolist())]
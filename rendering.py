@@ -0,0 +1,328 @@
+"""
+Rendering for EvilClutches.
+
+Sprites are batched by layer into a single Surface.blits call, scaled from the fixed
+playfield onto whatever size the window is, and drawn over a parallax background.
+Only the rectangles that changed are pushed to the display unless most of the window did.
+"""
+import pygame
+
+
+def interpolated_position(sprite, alpha):
+    """
+    Gets where to draw a sprite between its previous and current simulation positions.
+    :param sprite: The sprite being drawn
+    :param alpha: Fraction of a simulation step since the last update, from 0 to 1
+    :return: The position to draw the sprite at
+    """
+    previous_pos = getattr(sprite, "previous_pos", None)
+    if previous_pos is None or alpha >= 1:
+        return sprite.rect
+
+    return (round(previous_pos[0] + (sprite.rect.x - previous_pos[0]) * alpha),
+            round(previous_pos[1] + (sprite.rect.y - previous_pos[1]) * alpha))
+
+
+class ScaledView:
+    """
+    Maps the fixed-size playfield onto the real window.
+    Game logic always works in playfield coordinates. Every image is rescaled once
+    per window size and kept, so drawing never calls transform.scale.
+    """
+    def __init__(self, playfield_size, cache_size):
+        """
+        :param playfield_size: (width, height) the game logic works in
+        :param cache_size: Number of window sizes whose rescaled images are kept
+        """
+        self.playfield_size = tuple(playfield_size)
+        self.cache_size = cache_size
+        self.size = self.playfield_size
+        self.scale_x = 1.0
+        self.scale_y = 1.0
+        self.scaled_by_size = {}
+        self.scaled = {}
+
+    def is_identity(self):
+        """
+        :return: True if the window is the same size as the playfield
+        """
+        return self.size == self.playfield_size
+
+    def resize(self, size, images):
+        """
+        Rescales every image to a new window size, reusing the result if this size was seen recently.
+        :param size: The new (width, height) of the window
+        :param images: Every image that will be drawn
+        :return: None
+        """
+        self.size = tuple(size)
+        self.scale_x = self.size[0] / self.playfield_size[0]
+        self.scale_y = self.size[1] / self.playfield_size[1]
+        if self.is_identity():
+            self.scaled = {}
+            return
+
+        # Sizes are kept from least to most recently used, so a size used again moves to the end
+        self.scaled = self.scaled_by_size.pop(self.size, None)
+        if self.scaled is None:
+            self.scaled = {image: pygame.transform.scale(image, self.scaled_size(image)) for image in images}
+        self.scaled_by_size[self.size] = self.scaled
+        # Forget the least recently used size so dragging the window edge does not grow the cache forever
+        if len(self.scaled_by_size) > self.cache_size:
+            del self.scaled_by_size[next(iter(self.scaled_by_size))]
+
+    def scaled_size(self, image):
+        """
+        :return: The size an image is drawn at in the window
+        """
+        return (max(1, round(image.get_width() * self.scale_x)), max(1, round(image.get_height() * self.scale_y)))
+
+    def image(self, image):
+        """
+        :return: The rescaled copy of an image, or the image itself at the playfield size.
+        Images new since the resize, like frames reloaded by the frame cache, are rescaled once here.
+        """
+        scaled = self.scaled.get(image)
+        if scaled is None:
+            if self.is_identity():
+                return image
+            scaled = self.scaled[image] = pygame.transform.scale(image, self.scaled_size(image))
+
+        return scaled
+
+    def transform(self, blit_sequence):
+        """
+        Maps (image, playfield position) pairs to (rescaled image, window position) pairs.
+        :param blit_sequence: Iterable of (image, position) pairs
+        :return: List of (image, position) pairs
+        """
+        scale_x = self.scale_x
+        scale_y = self.scale_y
+        scaled = self.scaled
+        return [(scaled[image] if image in scaled else self.image(image),
+                 (round(position[0] * scale_x), round(position[1] * scale_y)))
+                for image, position in blit_sequence]
+
+
+class RenderQueue:
+    """
+    Collects (image, position) pairs from every group by layer and draws them all
+    with a single Surface.blits call.
+    """
+    def __init__(self, camera=None):
+        """
+        :param camera: Camera whose viewport culls what is drawn, or None to draw everything
+        """
+        self.camera = camera
+        self.layers = {}
+
+    def push(self, layer, blit_sequence):
+        """
+        Queues a sequence of (image, position) pairs on a layer.
+        :param layer: Layer number, higher layers are drawn on top
+        :param blit_sequence: Iterable of (image, position) pairs
+        :return: None
+        """
+        self.layers.setdefault(layer, []).extend(blit_sequence)
+
+    def push_group(self, layer, group, alpha=1.0, view=None):
+        """
+        Queues every sprite of a group, or every projectile of an array store, on a layer.
+        :param layer: Layer number, higher layers are drawn on top
+        :param group: The sprite group or projectile array store
+        :param alpha: How far between the previous and current simulation step to draw sprites
+        :param view: ScaledView mapping the playfield onto the window, or None to draw unscaled
+        :return: None
+        """
+        if hasattr(group, "blit_sequence"):
+            rows = None if self.camera is None else self.camera.visible_rows(group)
+            blit_sequence = group.blit_sequence(alpha, rows)
+        else:
+            sprites = group if self.camera is None else self.camera.visible(group)
+            blit_sequence = [(sprite.image, interpolated_position(sprite, alpha)) for sprite in sprites]
+
+        if view is not None and not view.is_identity():
+            blit_sequence = view.transform(blit_sequence)
+        self.push(layer, blit_sequence)
+
+    def flush(self, surface, doreturn=False):
+        """
+        Draws everything queued, lowest layer first, and empties the queue.
+        :param surface: The surface to draw on
+        :param doreturn: Whether to return the rects that were drawn to
+        :return: List of the drawn rects if doreturn is set, otherwise None
+        """
+        sequence = [item for layer in sorted(self.layers) for item in self.layers[layer]]
+        self.layers.clear()
+        return surface.blits(sequence, doreturn)
+
+
+class BackgroundLayer:
+    """
+    One background image, tiled into a strip wide enough that every scroll position
+    is a single window-sized slice of it.
+    """
+    def __init__(self, image, speed, opaque, playfield_size):
+        # Opaque layers are converted without alpha so they blit as plain copies
+        self.image = image.convert() if opaque else image.convert_alpha()
+        self.speed = speed
+        self.offset = 0
+        self.strip = self.build_strip(opaque, playfield_size)
+
+    def build_strip(self, opaque, playfield_size):
+        """
+        Tiles the image across the playfield, with one extra tile to scroll into.
+        :param opaque: Whether the layer covers everything behind it
+        :param playfield_size: (width, height) of the playfield
+        :return: The strip surface
+        """
+        tile_width, tile_height = self.image.get_size()
+        columns = -(-playfield_size[0] // tile_width) + (1 if self.speed else 0)
+        rows = -(-playfield_size[1] // tile_height)
+        size = (columns * tile_width, rows * tile_height)
+        strip = pygame.Surface(size).convert() if opaque else pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        strip.blits([(self.image, (column * tile_width, row * tile_height))
+                     for column in range(columns) for row in range(rows)], False)
+        return strip
+
+    def update(self):
+        """
+        Scrolls the layer by one simulation step.
+        :return: None
+        """
+        self.offset = (self.offset + self.speed) % self.image.get_width()
+
+    def draw(self, surface, view, rects, alpha):
+        """
+        Copies the visible slice of the strip under each rect.
+        :param surface: The surface to draw on
+        :param view: ScaledView mapping the playfield onto the window
+        :param rects: Window rects to draw
+        :param alpha: How far between the previous and current simulation step to draw the layer
+        :return: None
+        """
+        offset = (self.offset - self.speed * (1 - alpha)) % self.image.get_width()
+        slice_x = round(offset * view.scale_x)
+        strip = view.image(self.strip)
+        surface.blits([(strip, rect, (rect.x + slice_x, rect.y, rect.width, rect.height)) for rect in rects],
+                      False)
+
+
+class Background:
+    """
+    Parallax background of one or more layers, each scrolling at its own speed.
+    """
+    def __init__(self, layers):
+        self.layers = layers
+        self.scrolling = any(layer.speed for layer in layers)
+
+    def strips(self):
+        """
+        :return: List of the strip of every layer, for the ScaledView to rescale
+        """
+        return [layer.strip for layer in self.layers]
+
+    def update(self):
+        """
+        Scrolls every moving layer by one simulation step.
+        :return: None
+        """
+        if self.scrolling:
+            for layer in self.layers:
+                layer.update()
+
+    def draw(self, surface, view, rects=None, alpha=1.0):
+        """
+        Draws the visible slices of every layer, back to front.
+        :param surface: The surface to draw on
+        :param view: ScaledView mapping the playfield onto the window
+        :param rects: Window rects to restore, or None to fill the whole surface
+        :param alpha: How far between the previous and current simulation step to draw the layers
+        :return: None
+        """
+        if rects is None:
+            rects = [surface.get_rect()]
+        for layer in self.layers:
+            layer.draw(surface, view, rects, alpha)
+
+
+class DirtyRenderer:
+    """
+    Draws sprites and pushes only the rectangles that changed to the display.
+    Each frame the background is restored under last frame's sprite rects,
+    the sprites are drawn again, and both sets of rects are passed to display.update.
+    A scrolling background redraws the whole window every frame, and so does any frame
+    whose dirty rects add up to more than full_redraw_fraction of the window.
+    """
+    def __init__(self, surface, background, view, render_queue, images, full_redraw_fraction, full_redraw=False):
+        """
+        :param surface: The window surface
+        :param background: Background restored under the sprites
+        :param view: ScaledView mapping the playfield onto the window
+        :param render_queue: RenderQueue the sprites are batched into
+        :param images: Function returning every image to rescale when the window is resized
+        :param full_redraw_fraction: Fraction of the window the dirty rects may cover before
+                                     the frame is redrawn in full
+        :param full_redraw: Whether to redraw the whole window every frame
+        """
+        self.surface = surface
+        self.background = background
+        self.images = images
+        self.full_redraw_fraction = full_redraw_fraction
+        self.full_redraw = full_redraw
+        self.last_rects = []
+        self.needs_full_redraw = True
+        self.updated_area = 0
+        # Summed area of the rects the last frame dirtied, full redraw or not
+        self.dirty_area = 0
+        self.render_queue = render_queue
+        self.view = view
+
+    def resize(self, size):
+        """
+        Rescales everything for a new window size and redraws the whole window.
+        :param size: The new (width, height) of the window
+        :return: None
+        """
+        self.surface = pygame.display.get_surface()
+        self.view.resize(size, self.images())
+        self.last_rects = []
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces the next frame to redraw and push the whole window.
+        :return: None
+        """
+        self.needs_full_redraw = True
+
+    def draw(self, groups, alpha=1.0):
+        """
+        Draws the groups in order and updates the display.
+        :param groups: The sprite groups or projectile array stores to draw, back to front
+        :param alpha: How far between the previous and current simulation step to draw sprites
+        :return: None
+        """
+        window_area = self.surface.get_width() * self.surface.get_height()
+        # Crowded frames come in runs, so a crowded last frame restores the whole background too
+        full_redraw = (self.full_redraw or self.needs_full_redraw or self.background.scrolling or
+                       self.dirty_area > window_area * self.full_redraw_fraction)
+        self.background.draw(self.surface, self.view, None if full_redraw else self.last_rects, alpha)
+
+        for layer, group in enumerate(groups):
+            self.render_queue.push_group(layer, group, alpha, self.view)
+
+        # The drawn rects are only needed to erase the sprites again on a dirty-rect frame
+        new_rects = self.render_queue.flush(self.surface, not (self.full_redraw or self.background.scrolling)) or []
+
+        dirty_rects = self.last_rects + new_rects
+        self.dirty_area = sum(rect.width * rect.height for rect in dirty_rects)
+        if full_redraw or self.dirty_area > window_area * self.full_redraw_fraction:
+            pygame.display.update()
+            self.updated_area = window_area
+            self.needs_full_redraw = False
+        else:
+            pygame.display.update(dirty_rects)
+            self.updated_area = self.dirty_area
+
+        self.last_rects = new_rects
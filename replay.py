@@ -0,0 +1,217 @@
+"""
+Replay recording and playback for EvilClutches.
+
+A replay is the random seed plus one byte of input per simulation step: whether W and S
+were held and how many times SPACE was pressed. Because game logic runs in fixed steps on
+a simulation clock, feeding the same bytes back with the same seed reproduces the session.
+
+Usage:
+    python replay.py session.replay              fast-forward headless and check the result
+    python replay.py session.replay --realtime   play back in a window at normal speed
+"""
+import argparse
+import random
+import struct
+import time
+
+import pygame
+
+from harness import KeyState, load_game, reset_world, silenced
+
+REPLAY_MAGIC = b"ECRP"
+REPLAY_VERSION = 2
+# Magic, version, seed and tick count
+REPLAY_HEADER = struct.Struct("<4sHQI")
+REPLAY_TRAILER = struct.Struct("<I")
+
+# Bits of a tick byte for each held key; the SPACE press count fills the bits above
+HELD_KEY_BITS = ((pygame.K_w, 0x01), (pygame.K_s, 0x02))
+SPACE_SHIFT = 2
+MAX_SPACE_PRESSES = 0xFF >> SPACE_SHIFT
+
+
+class Recording:
+    def __init__(self, seed, ticks=None, checksum=0):
+        self.seed = seed
+        self.ticks = bytearray(ticks or b"")
+        self.checksum = checksum
+
+    def save(self, file_name):
+        """
+        Writes the recording to a binary replay file.
+        :param file_name: The replay file
+        :return: None
+        """
+        with open(file_name, "wb") as replay:
+            replay.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(self.ticks)))
+            replay.write(self.ticks)
+            replay.write(REPLAY_TRAILER.pack(self.checksum))
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Reads a recording from a binary replay file.
+        :param file_name: The replay file
+        :return: The Recording
+        """
+        with open(file_name, "rb") as replay:
+            data = replay.read()
+
+        magic, version, seed, tick_count = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{file_name} is not a version {REPLAY_VERSION} replay")
+
+        start = REPLAY_HEADER.size
+        ticks = data[start:start + tick_count]
+        (checksum,) = REPLAY_TRAILER.unpack_from(data, start + tick_count)
+        return cls(seed, ticks, checksum)
+
+
+class RecordingInput:
+    """
+    Passes another input source through unchanged and records one byte of it per simulation step.
+    """
+    def __init__(self, source, seed):
+        self.source = source
+        self.recording = Recording(seed)
+        self.space_presses = 0
+        self.held = 0
+
+    def key_presses(self):
+        """
+        :return: List of the keys pressed since the last call
+        """
+        presses = self.source.key_presses()
+        self.space_presses += presses.count(pygame.K_SPACE)
+        return presses
+
+    def get_pressed(self):
+        """
+        :return: The state of every key, indexable by key constant
+        """
+        keys = self.source.get_pressed()
+        self.held = 0
+        for key, bit in HELD_KEY_BITS:
+            if keys[key]:
+                self.held |= bit
+        return keys
+
+    def finished(self):
+        """
+        :return: True once the input being recorded has run out
+        """
+        return self.source.finished()
+
+    def end_tick(self):
+        """
+        Records the input of the simulation step that just finished.
+        :return: None
+        """
+        self.source.end_tick()
+        self.recording.ticks.append(self.held | min(self.space_presses, MAX_SPACE_PRESSES) << SPACE_SHIFT)
+        self.space_presses = 0
+        self.held = 0
+
+
+class PlaybackInput:
+    """
+    Feeds a recording back to the game one simulation step at a time.
+    """
+    def __init__(self, recording):
+        self.recording = recording
+        self.tick_index = 0
+
+    def finished(self):
+        """
+        :return: True once every recorded step has been played
+        """
+        return self.tick_index >= len(self.recording.ticks)
+
+    def current_tick(self):
+        """
+        :return: The recorded byte for this step, or 0 once the recording has run out
+        """
+        return 0 if self.finished() else self.recording.ticks[self.tick_index]
+
+    def key_presses(self):
+        """
+        :return: List of the keys pressed on this step
+        """
+        return [pygame.K_SPACE] * (self.current_tick() >> SPACE_SHIFT)
+
+    def get_pressed(self):
+        """
+        :return: The keys held on this step
+        """
+        tick = self.current_tick()
+        return KeyState(frozenset(key for key, bit in HELD_KEY_BITS if tick & bit))
+
+    def end_tick(self):
+        """
+        Moves on to the next recorded step.
+        :return: None
+        """
+        self.tick_index += 1
+
+
+def fast_forward(game, recording):
+    """
+    Runs a recording through the simulation as fast as possible, with no frame cap or drawing.
+    :param game: The game module
+    :param recording: The Recording to play
+    :return: Dictionary of the playback results
+    """
+    random.seed(recording.seed)
+    game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+    game.game_input = PlaybackInput(recording)
+    reset_world(game, game.VECTORIZED_PROJECTILES)
+    dragon, boss = game.create_world()
+    profiler = game.FrameProfiler(("update", "collisions", "animate"), len(recording.ticks) or 1)
+
+    # The game prints on every hit, and terminal output is not part of what is measured
+    with silenced():
+        start = time.perf_counter()
+        while not game.game_input.finished():
+            profiler.start_frame()
+            game.step_simulation(dragon, boss, profiler)
+            profiler.end_frame()
+    elapsed = time.perf_counter() - start
+
+    checksum = game.world_checksum()
+    return {
+        "ticks": len(recording.ticks),
+        "seconds": elapsed,
+        "ticks_per_second": len(recording.ticks) / elapsed if elapsed else float("inf"),
+        "checksum": checksum,
+        "matches": checksum == recording.checksum,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back an EvilClutches replay")
+    parser.add_argument("replay_file", help="replay file recorded with REPLAY_RECORD_FILE")
+    parser.add_argument("--realtime", action="store_true", help="play back in a window at normal speed")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.replay_file)
+    # main() runs the game's startup itself, so it is only run here for a fast-forward
+    game = load_game(headless=not args.realtime, start=not args.realtime)
+
+    if args.realtime:
+        random.seed(recording.seed)
+        game.game_input = PlaybackInput(recording)
+        # main() stops stepping once the recording runs out, so the world ends where the session did
+        game.main()
+        checksum = game.world_checksum()
+        print(f"ticks={len(recording.ticks)} checksum={checksum:08x} "
+              f"{'matches' if checksum == recording.checksum else 'DOES NOT MATCH'} recording ({recording.checksum:08x})")
+        return
+
+    result = fast_forward(game, recording)
+    print(f"ticks={result['ticks']} time={result['seconds']:.3f}s "
+          f"ticks/sec={result['ticks_per_second']:.0f} checksum={result['checksum']:08x} "
+          f"{'matches' if result['matches'] else 'DOES NOT MATCH'} recording ({recording.checksum:08x})")
+
+
+if __name__ == "__main__":
+    main()
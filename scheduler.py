@@ -0,0 +1,70 @@
+"""
+Timer heap for EvilClutches.
+
+Timers are kept on the game's simulation clock rather than wall time, so a seeded game
+fires the same callbacks on the same steps every time it is played back.
+"""
+import heapq
+import itertools
+
+
+class Scheduler:
+    """
+    Heap of timers on the game clock. Timers are due on a whole simulation step rather than
+    a millisecond time, so they never round onto the step after. Timers fire in due order,
+    and timers due on the same step fire in the order they were scheduled, so a seeded game
+    always runs the same callbacks on the same steps.
+    """
+    def __init__(self, current_step):
+        """
+        :param current_step: Function returning the current simulation step of the game clock
+        """
+        self.current_step = current_step
+        self.timers = []
+        self.sequence = itertools.count()
+
+    def schedule(self, steps, callback, *args):
+        """
+        Runs a callback once the game clock has moved forward by a number of steps.
+        :param steps: Simulation steps to wait
+        :param callback: Function to call
+        :param args: Arguments to call it with
+        :return: The timer, which can be passed to cancel
+        """
+        timer = [self.current_step() + steps, next(self.sequence), callback, args]
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def cancel(self, timer):
+        """
+        Stops a timer from firing. It is dropped from the heap when it comes due.
+        :param timer: A timer returned by schedule
+        :return: None
+        """
+        timer[2] = None
+
+    def run_due(self, current_step):
+        """
+        Fires every timer due by the current step, including ones scheduled by the callbacks.
+        :param current_step: Current simulation step of the game clock
+        :return: Number of timers fired
+        """
+        fired = 0
+        timers = self.timers
+        while timers and timers[0][0] <= current_step:
+            _, _, callback, args = heapq.heappop(timers)
+            if callback is not None:
+                callback(*args)
+                fired += 1
+
+        return fired
+
+    def clear(self):
+        """
+        Drops every pending timer.
+        :return: None
+        """
+        self.timers = []
+
+    def __len__(self):
+        return len(self.timers)
@@ -0,0 +1,259 @@
+"""
+Headless batch simulations for balancing EvilClutches.
+
+run_simulation plays one game with a set of tuning parameters and an input policy, and
+returns stats such as kills, survival time and peak entity counts. run_sweep fans every
+combination of parameters, policies and seeds out over a ProcessPoolExecutor and the
+results are collected into a CSV file.
+
+Usage:
+    python simulate.py --boss-speed 4 6 8 --spawn-odds 100 150 --seeds 20 --output sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from harness import KeyState, default_script, load_game, reset_world, silenced
+
+# Game constants a parameter set may override
+TUNABLE_PARAMETERS = ("BOSS_SPEED", "DEMON_SPEED", "FIREBALL_SPEED", "DEMON_SPAWN_INTERVAL", "DEMON_SPAWN_ODDS")
+# Parameters that live on an entity type from the entity file instead of the game module
+ENTITY_PARAMETERS = {"DEMON_SPEED": ("demon", "speed"), "FIREBALL_SPEED": ("fireball", "speed")}
+# Simulation steps between AI shots
+AI_FIRE_INTERVAL = 10
+# How close, in pixels, the fireball's line has to be to a demon before the AI fires
+AI_AIM_TOLERANCE = 20
+
+# The game module, loaded once per worker process
+worker_game = None
+
+
+class PolicyInput:
+    """
+    Input source that asks a policy which keys to hold and press on every simulation step.
+    """
+    def __init__(self, policy, game, dragon):
+        self.policy = policy
+        self.game = game
+        self.dragon = dragon
+        self.tick = 0
+        self.held = frozenset()
+        self.pressed = []
+
+    def key_presses(self):
+        """
+        :return: List of the keys pressed on this step
+        """
+        self.held, self.pressed = self.policy(self.game, self.dragon, self.tick)
+        return self.pressed
+
+    def get_pressed(self):
+        """
+        :return: The keys held on this step
+        """
+        return KeyState(self.held)
+
+    def end_tick(self):
+        """
+        Moves on to the next simulation step.
+        :return: None
+        """
+        self.tick += 1
+
+
+def scripted_policy(game, dragon, tick):
+    """
+    Replays the benchmark's input script: sweep down and up, firing every 5 steps.
+    :return: (held keys, pressed keys)
+    """
+    script = getattr(scripted_policy, "script", None)
+    if script is None:
+        script = scripted_policy.script = default_script(game)
+
+    held, pressed = script[tick % len(script)]
+    return frozenset(held), pressed
+
+
+def ai_policy(game, dragon, tick):
+    """
+    Lines the dragon's fireballs up with the nearest demon and fires when it is in line.
+    :return: (held keys, pressed keys)
+    """
+    pygame = game.pygame
+    if not game.demon_group:
+        return frozenset(), []
+
+    target = min(game.demon_group, key=lambda demon: demon.rect.x)
+    fireball_type = game.fireball_type
+    fireball_y = fireball_type.spawn_position(dragon.x_pos, dragon.y_pos)[1] + fireball_type.height // 2
+    distance = target.rect.centery - fireball_y
+
+    held = frozenset()
+    if distance > game.DRAGON_SPEED:
+        held = frozenset((pygame.K_s,))
+    elif distance < -game.DRAGON_SPEED:
+        held = frozenset((pygame.K_w,))
+
+    pressed = []
+    if abs(distance) <= AI_AIM_TOLERANCE and tick % AI_FIRE_INTERVAL == 0:
+        pressed = [pygame.K_SPACE]
+
+    return held, pressed
+
+
+POLICIES = {"scripted": scripted_policy, "ai": ai_policy}
+
+
+def parameter_target(game, name):
+    """
+    :param game: The game module
+    :param name: A TUNABLE_PARAMETERS name
+    :return: (object holding the parameter, attribute name)
+    """
+    if name in ENTITY_PARAMETERS:
+        entity_name, attribute = ENTITY_PARAMETERS[name]
+        return game.entity_types[entity_name], attribute
+
+    return game, name
+
+
+def run_simulation(parameters, policy="ai", ticks=3600, seed=0, game=None):
+    """
+    Plays one headless game and collects its stats.
+    :param parameters: Dictionary of TUNABLE_PARAMETERS names to values
+    :param policy: Name of the input policy in POLICIES
+    :param ticks: Number of simulation steps to run
+    :param seed: Random seed for the run
+    :param game: The game module, loaded if not given
+    :return: Dictionary of the parameters, policy, seed and stats
+    """
+    game = game if game is not None else load_game()
+    unknown = set(parameters) - set(TUNABLE_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    defaults = {name: getattr(*parameter_target(game, name)) for name in parameters}
+    try:
+        for name, value in parameters.items():
+            setattr(*parameter_target(game, name), value)
+
+        random.seed(seed)
+        game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+        reset_world(game, False)
+        dragon, boss = game.create_world()
+        game.game_input = PolicyInput(POLICIES[policy], game, dragon)
+        profiler = game.FrameProfiler(("update", "collisions", "animate"), 1)
+
+        kills = 0
+        peak_demons = 0
+        peak_fireballs = 0
+        survival_ticks = ticks
+        for tick in range(ticks):
+            profiler.start_frame()
+            kills += game.step_simulation(dragon, boss, profiler)
+            profiler.end_frame()
+            peak_demons = max(peak_demons, len(game.demon_group))
+            peak_fireballs = max(peak_fireballs, len(game.fireball_group))
+            # The game has no death yet, so survival ends at the first demon touching the dragon
+            if survival_ticks == ticks and game.pygame.sprite.spritecollideany(
+                    dragon, game.demon_group, game.pygame.sprite.collide_mask):
+                survival_ticks = tick + 1
+    finally:
+        for name, value in defaults.items():
+            setattr(*parameter_target(game, name), value)
+
+    return dict(parameters, policy=policy, seed=seed, ticks=ticks, kills=kills,
+                survival_seconds=round(survival_ticks * game.SIMULATION_STEP_MS / 1000, 3),
+                peak_demons=peak_demons, peak_fireballs=peak_fireballs)
+
+
+def init_worker():
+    """
+    Loads the game once in each worker process.
+    :return: None
+    """
+    global worker_game
+    with silenced():
+        worker_game = load_game()
+
+
+def run_job(job):
+    """
+    Runs one simulation in a worker process, keeping the game's console output quiet.
+    :param job: (parameters, policy, ticks, seed)
+    :return: The simulation's result dictionary
+    """
+    parameters, policy, ticks, seed = job
+    with silenced():
+        return run_simulation(parameters, policy, ticks, seed, worker_game)
+
+
+def run_sweep(parameter_grid, policies, seeds, ticks, workers=None):
+    """
+    Runs every combination of parameter values, policies and seeds across processes.
+    :param parameter_grid: Dictionary of parameter names to lists of values
+    :param policies: List of policy names
+    :param seeds: List of random seeds
+    :param ticks: Number of simulation steps per run
+    :param workers: Number of processes, or None for one per core
+    :return: List of result dictionaries
+    """
+    names = list(parameter_grid)
+    jobs = [(dict(zip(names, values)), policy, ticks, seed)
+            for values in itertools.product(*parameter_grid.values())
+            for policy in policies
+            for seed in seeds]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        return list(executor.map(run_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+
+
+def write_csv(results, file_name):
+    """
+    Writes the results of a sweep to a CSV file.
+    :param results: List of result dictionaries
+    :param file_name: The CSV file
+    :return: None
+    """
+    if not results:
+        return
+
+    with open(file_name, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run EvilClutches balancing sweeps")
+    parser.add_argument("--boss-speed", type=int, nargs="+")
+    parser.add_argument("--demon-speed", type=int, nargs="+")
+    parser.add_argument("--fireball-speed", type=int, nargs="+")
+    parser.add_argument("--spawn-interval", type=int, nargs="+")
+    parser.add_argument("--spawn-odds", type=int, nargs="+")
+    parser.add_argument("--policy", nargs="+", default=["ai"], choices=sorted(POLICIES))
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds per combination")
+    parser.add_argument("--ticks", type=int, default=3600, help="simulation steps per run")
+    parser.add_argument("--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--output", default="sweep.csv", help="CSV file for the results")
+    args = parser.parse_args()
+
+    options = {
+        "BOSS_SPEED": args.boss_speed,
+        "DEMON_SPEED": args.demon_speed,
+        "FIREBALL_SPEED": args.fireball_speed,
+        "DEMON_SPAWN_INTERVAL": args.spawn_interval,
+        "DEMON_SPAWN_ODDS": args.spawn_odds,
+    }
+    parameter_grid = {name: values for name, values in options.items() if values}
+
+    results = run_sweep(parameter_grid, args.policy, list(range(args.seeds)), args.ticks, args.workers)
+    write_csv(results, args.output)
+    print(f"Wrote {len(results)} runs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def game():
+    """
+    The Part-7 game module, loaded headless once for the whole test run.
+    """
+    from harness import load_game
+
+    return load_game()
@@ -0,0 +1,48 @@
+import json
+
+import assets
+
+
+def write_cache(path, header, data=b"", header_length=None):
+    header_bytes = json.dumps(header).encode() if isinstance(header, dict) else header
+    if header_length is None:
+        header_length = len(header_bytes)
+    path.write_bytes(assets.CACHE_PREFIX.pack(assets.CACHE_MAGIC, assets.CACHE_VERSION, header_length) +
+                     header_bytes + data)
+
+
+def test_empty_cache_is_stale(tmp_path):
+    cache_file = tmp_path / "assets.cache"
+    cache_file.write_bytes(b"")
+
+    assert assets.load(str(cache_file), {}, [], (0, 0, 0)) is None
+
+
+def test_corrupt_header_is_stale(tmp_path):
+    cache_file = tmp_path / "assets.cache"
+    write_cache(cache_file, b'{"spec": {"ima')
+
+    assert assets.load(str(cache_file), {}, [], (0, 0, 0)) is None
+
+
+def test_header_past_end_of_file_is_stale(tmp_path):
+    cache_file = tmp_path / "assets.cache"
+    write_cache(cache_file, b"{}", header_length=4096)
+
+    assert assets.load(str(cache_file), {}, [], (0, 0, 0)) is None
+
+
+def test_truncated_pixels_are_stale(tmp_path):
+    image_file = tmp_path / "image.png"
+    image_file.write_bytes(b"")
+    images = {"image": (str(image_file), None)}
+    header = {
+        "spec": assets.asset_spec(images, []),
+        "sources": {str(image_file): image_file.stat().st_mtime},
+        "images": {"image": {"offset": 0, "length": 16, "size": [2, 2]}},
+        "sheets": [],
+    }
+    cache_file = tmp_path / "assets.cache"
+    write_cache(cache_file, header, b"\0" * 8)
+
+    assert assets.load(str(cache_file), images, [], (0, 0, 0)) is None
@@ -0,0 +1,26 @@
+from camera import Camera
+
+
+def test_array_rows_outside_the_viewport_are_not_drawn_or_animated(game):
+    demon_type = game.entity_types["demon"]
+    arrays = game.ProjectileArrays(demon_type.frame_list, 0, 4, game.ANIMATION_INTERVAL, game.COLLISION_SWEEP_ROW_HEIGHT)
+    camera = Camera((0, 0, 100, 100), 50, 4)
+    for x_pos in (10, 120, 400):
+        arrays.spawn(x_pos, 10, 0, 0)
+
+    visible = camera.visible_rows(arrays)
+    assert [position for _, position in arrays.blit_sequence(1.0, visible)] == [(10, 10)]
+
+    camera.advance()
+    arrays.animate(game.ANIMATION_INTERVAL, camera.rows_due_for_update(arrays))
+    assert arrays.frame_index[:3].tolist() == [1, 0, 0]
+    assert camera.counts == {"visible": 1, "near": 1, "far": 1}
+
+
+def test_create_world_resets_the_camera(game):
+    game.camera.steps = 3
+    game.create_world()
+
+    assert game.camera.steps == 0
+    for group in (game.dragon_group, game.boss_group):
+        group.empty()
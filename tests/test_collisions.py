@@ -0,0 +1,78 @@
+import random
+
+import pygame
+
+
+def layout(frame_list, rng, count, area):
+    return [(rng.randrange(area), rng.randrange(area), rng.randrange(len(frame_list))) for _ in range(count)]
+
+
+def sprite_group(frame_list, placements):
+    group = pygame.sprite.Group()
+    for x_pos, y_pos, frame in placements:
+        sprite = pygame.sprite.Sprite(group)
+        sprite.image = frame_list[frame]
+        sprite.mask = frame_list.masks[frame]
+        sprite.rect = sprite.image.get_rect(topleft=(x_pos, y_pos))
+    return group
+
+
+def groupcollide_result(group_a, group_b):
+    sprites_a = group_a.sprites()
+    sprites_b = group_b.sprites()
+    crashed = pygame.sprite.groupcollide(group_a, group_b, True, True, pygame.sprite.collide_mask)
+    hits = {sprites_a.index(sprite_a): [sprites_b.index(sprite_b) for sprite_b in hit]
+            for sprite_a, hit in crashed.items()}
+    return hits, [sprites_a.index(sprite) for sprite in group_a], [sprites_b.index(sprite) for sprite in group_b]
+
+
+def test_grid_groupcollide_matches_groupcollide(game):
+    fireballs = game.entity_types["fireball"].frame_list
+    demons = game.entity_types["demon"].frame_list
+    for seed in range(5):
+        rng = random.Random(seed)
+        placements_a = layout(fireballs, rng, 60, 400)
+        placements_b = layout(demons, rng, 60, 400)
+        expected = groupcollide_result(sprite_group(fireballs, placements_a), sprite_group(demons, placements_b))
+
+        group_a = sprite_group(fireballs, placements_a)
+        group_b = sprite_group(demons, placements_b)
+        sprites_a = group_a.sprites()
+        sprites_b = group_b.sprites()
+        stats = {}
+        crashed = game.grid_groupcollide(group_a, group_b, pygame.sprite.collide_mask, stats)
+        hits = {sprites_a.index(sprite_a): [sprites_b.index(sprite_b) for sprite_b in hit]
+                for sprite_a, hit in crashed.items()}
+
+        assert expected[0]
+        assert (hits, [sprites_a.index(sprite) for sprite in group_a],
+                [sprites_b.index(sprite) for sprite in group_b]) == expected
+        assert stats["candidates"] == stats["box_rejected"] + stats["mask_missed"] + sum(map(len, hits.values()))
+
+
+def test_projectile_arrays_collide_matches_groupcollide(game):
+    fireballs = game.entity_types["fireball"].frame_list
+    demons = game.entity_types["demon"].frame_list
+    for seed in range(5):
+        rng = random.Random(seed)
+        placements_a = layout(fireballs, rng, 60, 400)
+        placements_b = layout(demons, rng, 60, 400)
+        hits, survivors_a, survivors_b = groupcollide_result(sprite_group(fireballs, placements_a),
+                                                             sprite_group(demons, placements_b))
+
+        stores = []
+        for frame_list, placements in ((fireballs, placements_a), (demons, placements_b)):
+            arrays = game.ProjectileArrays(frame_list, 0, len(placements), game.ANIMATION_INTERVAL,
+                                           game.COLLISION_SWEEP_ROW_HEIGHT)
+            for x_pos, y_pos, frame in placements:
+                arrays.spawn(x_pos, y_pos, 0, 0)
+                arrays.frame_index[arrays.count - 1] = frame
+            stores.append(arrays)
+        arrays_a, arrays_b = stores
+
+        assert arrays_a.collide(arrays_b) == len(hits) > 0
+        for arrays, placements, survivors in ((arrays_a, placements_a, survivors_a),
+                                              (arrays_b, placements_b, survivors_b)):
+            remaining = list(zip(arrays.x[:arrays.count].tolist(), arrays.y[:arrays.count].tolist(),
+                                 arrays.frame_index[:arrays.count].tolist()))
+            assert remaining == [placements[index] for index in survivors]
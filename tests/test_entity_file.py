@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+
+def write_entities(tmp_path, **changes):
+    definitions = {
+        "fireball": {"role": "projectile", "image": "fireball.png", "size": [50, 48], "speed": 7, "anchor": [0, 0]},
+        "demon": {"role": "enemy", "image": "demon.png", "frames": 4, "size": [130, 140], "speed": -7,
+                  "anchor": [0, 0], "spawn_weight": 1, "sound": "demon"},
+    }
+    for name, fields in changes.items():
+        definitions[name].update(fields)
+    entity_file = tmp_path / "entities.json"
+    entity_file.write_text(json.dumps(definitions))
+    return str(entity_file)
+
+
+def test_entity_file_loads(game, tmp_path):
+    entity_types = game.load_entity_types(write_entities(tmp_path))
+
+    assert entity_types["demon"].group is game.demon_group
+
+
+def test_unknown_role_is_rejected(game, tmp_path):
+    with pytest.raises(ValueError, match="role"):
+        game.load_entity_types(write_entities(tmp_path, demon={"role": "boss"}))
+
+
+def test_unknown_sound_is_rejected(game, tmp_path):
+    with pytest.raises(ValueError, match="sound"):
+        game.load_entity_types(write_entities(tmp_path, demon={"sound": "roar"}))
+
+
+def test_empty_spawn_table_schedules_no_spawns(game, monkeypatch):
+    monkeypatch.setattr(game, "spawn_types", [])
+    monkeypatch.setattr(game, "spawn_weights", [])
+    monkeypatch.setattr(game, "BOSS_WAVE_INTERVAL", 1000)
+    game.game_time = game.SimulationClock(game.SIMULATION_STEP_MS)
+
+    game.create_world()
+
+    assert len(game.scheduler) == 0
+    game.dragon_group.empty()
+    game.boss_group.empty()
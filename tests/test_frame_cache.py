@@ -0,0 +1,33 @@
+def test_spawns_hit_the_frame_cache(game):
+    game.reset_entities()
+    game.demon_group.empty()
+    before = game.frame_cache.stats()
+
+    for index in range(10):
+        game.entity_types["demon"].spawn(index, index)
+
+    after = game.frame_cache.stats()
+    assert after["hits"] - before["hits"] == 10
+    assert after["misses"] == before["misses"]
+    game.demon_group.empty()
+
+
+def test_invalidate_moves_sprites_to_reloaded_frames(game):
+    game.reset_entities()
+    game.demon_group.empty()
+    demon_type = game.entity_types["demon"]
+    demon_type.spawn(0, 0)
+    demon = next(iter(game.demon_group))
+    old_frames = demon_type.frame_list
+    view = game.ScaledView((game.WINDOW_WIDTH, game.WINDOW_HEIGHT), game.SCALED_SIZE_CACHE)
+    view.resize((game.WINDOW_WIDTH * 2, game.WINDOW_HEIGHT * 2), game.scalable_images())
+    misses = game.frame_cache.stats()["misses"]
+
+    game.frame_cache.invalidate(demon_type.image_file)
+
+    assert game.frame_cache.stats()["misses"] == misses + 1
+    assert demon_type.frame_list is not old_frames
+    assert demon.frame_list is demon_type.frame_list
+    assert demon.image is demon_type.frame_list[demon.current_frame_index]
+    assert view.image(demon.image).get_size() == view.scaled_size(demon.image)
+    game.demon_group.empty()
@@ -0,0 +1,78 @@
+import json
+
+from leaderboard import Leaderboard
+
+
+def make_leaderboard(tmp_path, compact_interval=1000):
+    return Leaderboard(str(tmp_path / "leaderboard.json"), str(tmp_path / "leaderboard.log"), compact_interval)
+
+
+def write_snapshot(tmp_path, scores):
+    entries = [{"name": name, "score": score, "position": position}
+               for position, (name, score) in enumerate(scores, start=1)]
+    (tmp_path / "leaderboard.json").write_text(json.dumps(entries))
+
+
+def names(leaderboard):
+    return [entry["name"] for entry in leaderboard.entries()]
+
+
+def test_add_without_load_keeps_score(tmp_path):
+    write_snapshot(tmp_path, [("amy", 300), ("bob", 200)])
+
+    board = make_leaderboard(tmp_path)
+    assert board.add("zed", 99999) == 1
+    board.close()
+
+    reloaded = make_leaderboard(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == ["zed", "amy", "bob"]
+
+
+def test_compact_without_load_keeps_snapshot(tmp_path):
+    write_snapshot(tmp_path, [("amy", 300), ("bob", 200)])
+
+    board = make_leaderboard(tmp_path, compact_interval=2)
+    board.add("cat", 250)
+    board.add("dan", 100)
+
+    reloaded = make_leaderboard(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == ["amy", "cat", "bob", "dan"]
+
+
+def test_log_replayed_after_crash(tmp_path):
+    write_snapshot(tmp_path, [("amy", 300)])
+
+    board = make_leaderboard(tmp_path)
+    board.load()
+    board.add("bob", 400)
+    board.add("cat", 100)
+    # Crash before compaction: the scores only exist in the log
+    board.close()
+
+    reloaded = make_leaderboard(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == ["bob", "amy", "cat"]
+
+
+def test_interrupted_compaction_does_not_duplicate(tmp_path):
+    write_snapshot(tmp_path, [("amy", 300)])
+
+    board = make_leaderboard(tmp_path)
+    board.load()
+    board.add("bob", 400)
+    board.add("cat", 100)
+    board.close()
+    # Crash after the snapshot was replaced but before the log was removed
+    write_snapshot(tmp_path, [(entry["name"], entry["score"]) for entry in board.entries()])
+
+    reloaded = make_leaderboard(tmp_path)
+    reloaded.load()
+    assert names(reloaded) == ["bob", "amy", "cat"]
+
+    reloaded.add("dan", 200)
+    reloaded.close()
+    again = make_leaderboard(tmp_path)
+    again.load()
+    assert names(again) == ["bob", "amy", "dan", "cat"]
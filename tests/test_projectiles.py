@@ -0,0 +1,12 @@
+def test_entities_have_no_dict_and_work_with_groups(game):
+    game.reset_entities()
+    game.demon_group.empty()
+    game.entity_types["demon"].spawn(10, 10)
+    demon = next(iter(game.demon_group))
+
+    assert not hasattr(demon, "__dict__")
+    assert demon.alive() and demon.groups() == [game.demon_group]
+
+    demon.kill()
+    assert not demon.alive() and len(game.demon_group) == 0
+    assert demon in game.entity_types["demon"].pool.free
@@ -0,0 +1,17 @@
+import pygame
+
+from rendering import ScaledView
+
+
+def test_scaled_view_forgets_the_least_recently_used_size():
+    images = [pygame.Surface((8, 8))]
+    view = ScaledView((8, 8), 2)
+    view.resize((16, 16), images)
+    first = view.scaled
+    view.resize((24, 24), images)
+    view.resize((16, 16), images)
+    view.resize((32, 32), images)
+
+    assert list(view.scaled_by_size) == [(16, 16), (32, 32)]
+    view.resize((16, 16), images)
+    assert view.scaled is first
@@ -0,0 +1,21 @@
+from scheduler import Scheduler
+
+
+def test_timers_fire_in_due_order_then_scheduled_order():
+    step = 0
+    scheduler = Scheduler(lambda: step)
+    fired = []
+    scheduler.schedule(2, fired.append, "late")
+    scheduler.schedule(1, fired.append, "first")
+    scheduler.schedule(1, fired.append, "second")
+    cancelled = scheduler.schedule(1, fired.append, "cancelled")
+    scheduler.cancel(cancelled)
+
+    assert scheduler.run_due(1) == 2
+    assert fired == ["first", "second"]
+
+    step = 1
+    scheduler.schedule(1, fired.append, "rescheduled")
+    assert scheduler.run_due(2) == 2
+    assert fired == ["first", "second", "late", "rescheduled"]
+    assert len(scheduler) == 0